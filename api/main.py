@@ -1,25 +1,60 @@
-import shutil
 import os
+import json
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi import BackgroundTasks
-import uuid
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import threading
+import logging
+import uuid
+from collections import OrderedDict
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
-from summary_pipeline import SummaryPipeline
+from summary_pipeline import pipeline_from_env
+from audio_loader import probe_duration, sniff_format
+from job_queue import JobScheduler, JobQueueFull
+from job_store import create_job_store
+from job_events import JobEvents
+from process_pool import PipelineProcessPool
+from profiling import PipelineMetrics
+from llm_client import response_cache
+from dialogue_format import DIALOGUE_FORMATS, format_dialogue, select_dialogue
+
+# Optional: orjson serializes large results several times faster than the
+# stdlib encoder, brotli-asgi compresses them better than gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 
-pipeline = SummaryPipeline()
+class FastJSONResponse(JSONResponse):
+    # JSONResponse encoded with orjson when it is installed
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+pipeline = pipeline_from_env()
 
 TEMP_DIR = 'temp_files/'
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', '100')) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 app = FastAPI(
     title='Smart call summarizer',
@@ -27,6 +62,45 @@ app = FastAPI(
     version=1.0
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse by Content-Length before the multipart body is received and spooled
+    content_length = request.headers.get("content-length")
+    if request.method == "POST" and content_length and content_length.isdigit() \
+            and int(content_length) > MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE:
+        return JSONResponse(status_code=413, content={"detail": "Файл слишком большой"})
+    return await call_next(request)
+
+UPLOAD_PATHS = ('/summary-audio', '/summary-audio/start')
+QUEUE_FULL_DETAIL = "Сервер перегружен, попробуйте позже"
+
+@app.middleware("http")
+async def reject_uploads_when_queue_full(request: Request, call_next):
+    # Admission control before the multipart body is received: with the queue
+    # full the client gets 429 right away, not after sending the whole file.
+    # _enqueue_job checks again, the queue may fill up during the upload
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS and scheduler.full():
+        return JSONResponse(status_code=429, content={"detail": QUEUE_FULL_DETAIL})
+    return await call_next(request)
+
+class CompressionMiddleware:
+    # brotli (gzip for clients without it) for responses over minimum_size;
+    # the SSE stream is sent as is, a compressor would hold events back
+    def __init__(self, app, minimum_size=1024):
+        self.app = app
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith("/summary-audio/events/"):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -34,39 +108,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-JOBS = {}
+jobs = create_job_store(
+    os.getenv('JOB_STORE', 'memory'),
+    path=os.getenv('JOB_STORE_PATH', 'data/jobs.db'),
+    ttl_seconds=int(os.getenv('JOB_TTL_SECONDS', '3600')),
+    max_finished=int(os.getenv('JOB_MAX_FINISHED', '1000')),
+)
+
+events = JobEvents()
+SSE_FALLBACK_POLL_SECONDS = 1.0
+
+metrics = PipelineMetrics()
 
 def _update_job(job_id: str, **kwargs):
-    job = JOBS.get(job_id)
-    if not job:
-        job = {"status": "pending", "step": None, "progress": 0, "message": None, "result": None, "error": None}
-        JOBS[job_id] = job
-    job.update(kwargs)
+    jobs.update(job_id, **kwargs)
+    events.publish(job_id, {k: v for k, v in kwargs.items() if k != "result"})
 
-def process_job(job_id: str, file_path: str, flag_summary: bool = True, flag_dialogue: bool = True, flag_actions: bool = True):
+def _job_status(job_id: str):
+    job = jobs.get_status(job_id)
+    return job.get("status") if job else None
+
+def process_job(job_id: str, file_path: str, flag_summary: bool = True, flag_dialogue: bool = True, flag_actions: bool = True,
+                title: str = None):
     try:
+        if _job_status(job_id) == "cancelled":
+            raise RuntimeError("Cancelled by user")
         _update_job(job_id, status="processing", step=None, progress=0, message="Запуск...")
 
         def cb(**kwargs):
-            job = JOBS.get(job_id, {})
-            if job.get("status") == "cancelled":
+            if kwargs.get("timings"):
+                metrics.observe_profile(kwargs["timings"])
+            if _job_status(job_id) == "cancelled":
                 raise RuntimeError("Cancelled by user")
             _update_job(job_id, **kwargs)
 
-        result = pipeline.run(
+        result = runner.run(
             file_path,
             progress_cb=cb,
             flag_summary=flag_summary,
             flag_dialogue=flag_dialogue,
             flag_actions=flag_actions,
+            cancel_check=lambda: _job_status(job_id) == "cancelled",
+            call_id=job_id,
+            title=title,
         )
-        _update_job(job_id, status="completed", step="done", progress=100, message="Готово", result=result)
+        _update_job(job_id, status="completed", step="done", progress=100, message="Готово", result=result,
+                    partial_dialogue=None)
+        metrics.observe_job_status("completed")
+        return result
     except Exception as e:
-        job = JOBS.get(job_id, {})
-        if job.get("status") == "cancelled":
+        if _job_status(job_id) == "cancelled":
             _update_job(job_id, step="cancelled", message="Отменено пользователем", error=None)
+            metrics.observe_job_status("cancelled")
         else:
             _update_job(job_id, status="error", step="failed", message=str(e), error=str(e))
+            metrics.observe_job_status("error")
+        raise
     finally:
         if os.path.exists(file_path):
             try:
@@ -74,6 +171,88 @@ def process_job(job_id: str, file_path: str, flag_summary: bool = True, flag_dia
             except Exception:
                 pass
 
+
+# With PIPELINE_PROCESSES > 0 jobs run in forked worker processes that share
+# the preloaded models; otherwise in the scheduler's threads
+PIPELINE_PROCESSES = int(os.getenv('PIPELINE_PROCESSES', '0'))
+if PIPELINE_PROCESSES > 0:
+    runner = PipelineProcessPool(
+        pipeline,
+        num_workers=PIPELINE_PROCESSES,
+        threads_per_worker=int(os.getenv('PIPELINE_PROCESS_THREADS', '0')) or None,
+    )
+    runner.start()
+else:
+    runner = pipeline
+
+scheduler = JobScheduler(
+    process_job,
+    # one scheduler thread per process hands it jobs and relays its progress
+    num_workers=PIPELINE_PROCESSES or int(os.getenv('JOB_WORKERS', '1')),
+    max_queue_size=int(os.getenv('JOB_QUEUE_SIZE', '16')),
+    prioritize_short=os.getenv('JOB_PRIORITIZE_SHORT', '0') == '1',
+)
+scheduler.start()
+
+
+# Models are loaded lazily; with WARMUP_MODELS=1 they are loaded in the
+# background at startup and /ready reports 503 until that has finished
+warmup_state = {"running": False, "error": None}
+
+def _warm_up_models():
+    warmup_state.update(running=True, error=None)
+    try:
+        pipeline.models.warm_up()
+    except Exception as e:
+        logging.error(f"Model warm-up failed: {e}")
+        warmup_state["error"] = str(e)
+    finally:
+        warmup_state["running"] = False
+
+if os.getenv('WARMUP_MODELS', '0') == '1':
+    warmup_state["running"] = True
+    threading.Thread(target=_warm_up_models, name='model-warmup', daemon=True).start()
+
+
+async def _save_upload(file: UploadFile, job_id: str):
+    # Streams the upload to a job-scoped file in chunks; disk writes run in the
+    # threadpool so the event loop keeps serving other requests
+    header = await file.read(UPLOAD_CHUNK_SIZE)
+    audio_format = sniff_format(header[:16])
+    if audio_format is None:
+        raise HTTPException(status_code=400, detail="Неподдерживаемый формат файла")
+
+    file_path = os.path.join(TEMP_DIR, f"{job_id}.{audio_format}")
+    buffer = await run_in_threadpool(open, file_path, "wb")
+    size = 0
+    try:
+        chunk = header
+        while chunk:
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Файл слишком большой")
+            await run_in_threadpool(buffer.write, chunk)
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        os.remove(file_path)
+        raise
+    await run_in_threadpool(buffer.close)
+    return file_path
+
+async def _enqueue_job(job_id: str, file_path: str, flag_summary: bool, flag_dialogue: bool, flag_actions: bool,
+                       title: str = None):
+    duration = await run_in_threadpool(probe_duration, file_path) if scheduler.prioritize_short else None
+    await run_in_threadpool(jobs.create, job_id, file_path=file_path)
+    try:
+        future = scheduler.submit(job_id, file_path, flag_summary, flag_dialogue, flag_actions, title=title,
+                                  duration=duration)
+    except JobQueueFull:
+        await run_in_threadpool(jobs.delete, job_id)
+        os.remove(file_path)
+        raise HTTPException(status_code=429, detail=QUEUE_FULL_DETAIL)
+    return future
+
 @app.post('/summary-audio/start')
 async def summary_audio_start(
     file: UploadFile = File(...),
@@ -81,48 +260,176 @@ async def summary_audio_start(
     flag_dialogue: bool = Form(True),
     flag_actions: bool = Form(True),
 ):
-    if not file.filename.lower().endswith((".wav", ".mp3", ".m4a")):
-        raise HTTPException(status_code=400, detail="Неподдерживаемый формат файла")
-
-    file_path = os.path.join(TEMP_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
     job_id = str(uuid.uuid4())
-    JOBS[job_id] = {"status": "pending", "step": None, "progress": 0, "message": None, "result": None, "error": None}
-
-    thread = threading.Thread(
-        target=process_job,
-        args=(job_id, file_path, flag_summary, flag_dialogue, flag_actions),
-        daemon=True,
-    )
-    thread.start()
-
+    file_path = await _save_upload(file, job_id)
+    await _enqueue_job(job_id, file_path, flag_summary, flag_dialogue, flag_actions, title=file.filename)
     return {"jobId": job_id}
 
-@app.get('/summary-audio/status/{job_id}')
-async def summary_audio_status(job_id: str):
-    job = JOBS.get(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+def _status_payload(job_id: str, job: dict):
     response = {
         "status": job.get("status"),
         "step": job.get("step"),
         "progress": job.get("progress"),
         "message": job.get("message"),
     }
-    if job.get("status") == "completed" and job.get("result"):
-        response.update({"success": True, **job["result"]})
+    if job.get("status") == "pending":
+        position = scheduler.position(job_id)
+        if position:
+            response["queuePosition"] = position
+            response["message"] = f"В очереди: {position}"
     if job.get("status") == "error":
         response.update({"success": False, "error": job.get("error")})
-    return JSONResponse(response)
+    if job.get("timings"):
+        response["timings"] = job["timings"]
+    return response
+
+def _sse(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Decoded results of recently finished jobs: the dialogue endpoint is called
+# page by page, and the SQLite store would parse the whole result every time
+RESULT_CACHE_SIZE = 8
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+def _load_result(job_id: str):
+    with _result_cache_lock:
+        if job_id in _result_cache:
+            _result_cache.move_to_end(job_id)
+            return _result_cache[job_id]
+    result = jobs.get_result(job_id) or {}
+    with _result_cache_lock:
+        _result_cache[job_id] = result
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    return result
+
+def _check_dialogue_format(dialogue_format: str):
+    if dialogue_format not in DIALOGUE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат диалога: {', '.join(DIALOGUE_FORMATS)}")
+
+def _result_payload(result: dict, dialogue_format: str = "rows"):
+    # dialogue_format: rows (list of segments), columnar (see dialogue_format.py)
+    # or none (only dialogueCount; pages come from /summary-audio/dialogue)
+    payload = {"success": True, **result}
+    if result.get("dialogue") is not None:
+        payload["dialogueCount"] = len(result["dialogue"])
+        payload["dialogue"] = format_dialogue(result["dialogue"], dialogue_format)
+        if payload["dialogue"] is None:
+            del payload["dialogue"]
+    return payload
+
+@app.get('/summary-audio/status/{job_id}')
+async def summary_audio_status(job_id: str, include_result: bool = True, include_partial: bool = False,
+                               dialogue: str = "rows"):
+    _check_dialogue_format(dialogue)
+    job = await run_in_threadpool(jobs.get_status, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    response = _status_payload(job_id, job)
+    if include_partial and job.get("status") == "processing":
+        partial = await run_in_threadpool(jobs.get_partial, job_id)
+        if partial:
+            response["partialDialogue"] = partial
+    if include_result and job.get("status") == "completed":
+        result = await run_in_threadpool(_load_result, job_id)
+        if result:
+            response.update(_result_payload(result, dialogue))
+    return FastJSONResponse(response)
+
+@app.get('/summary-audio/result/{job_id}')
+async def summary_audio_result(job_id: str, dialogue: str = "rows"):
+    _check_dialogue_format(dialogue)
+    job = await run_in_threadpool(jobs.get_status, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if job.get("status") != "completed":
+        raise HTTPException(status_code=409, detail="Задача ещё не завершена")
+    result = await run_in_threadpool(_load_result, job_id)
+    return FastJSONResponse(_result_payload(result, dialogue))
+
+@app.get('/summary-audio/dialogue/{job_id}')
+async def summary_audio_dialogue(job_id: str, offset: int = 0, limit: int = 500,
+                                 start: float = None, end: float = None, format: str = "columnar"):
+    # One page of the dialogue: segments overlapping [start, end] seconds
+    # (the whole call by default), from offset, at most limit of them
+    _check_dialogue_format(format)
+    if offset < 0 or not 0 < limit <= 5000:
+        raise HTTPException(status_code=400, detail="offset >= 0, 0 < limit <= 5000")
+    job = await run_in_threadpool(jobs.get_status, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if job.get("status") != "completed":
+        raise HTTPException(status_code=409, detail="Задача ещё не завершена")
+    dialogue = (await run_in_threadpool(_load_result, job_id)).get("dialogue")
+    if dialogue is None:
+        raise HTTPException(status_code=404, detail="Диалог не запрашивался")
+    segments, total = select_dialogue(dialogue, offset, limit, start, end)
+    return FastJSONResponse({"offset": offset, "total": total, "dialogue": format_dialogue(segments, format)})
+
+@app.get('/summary-audio/events/{job_id}')
+async def summary_audio_events(job_id: str, request: Request, dialogue: str = "rows"):
+    _check_dialogue_format(dialogue)
+    if not await run_in_threadpool(jobs.get_status, job_id):
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    async def stream():
+        # Progress events from this process wake the stream immediately; the
+        # timeout re-reads the store for jobs run by another uvicorn worker
+        queue = events.subscribe(job_id)
+        try:
+            last = None
+            sent_partial = []
+            while not await request.is_disconnected():
+                job = await run_in_threadpool(jobs.get_status, job_id)
+                if not job:
+                    break
+                payload = _status_payload(job_id, job)
+                if payload != last:
+                    yield _sse("progress", payload)
+                    last = payload
+                # Streaming mode: only the new part of the partial dialogue is
+                # sent, from `offset` on (0 when speakers were assigned)
+                partial = []
+                if job.get("status") == "processing":
+                    partial = await run_in_threadpool(jobs.get_partial, job_id) or []
+                if partial and partial != sent_partial:
+                    offset = len(sent_partial) if partial[:len(sent_partial)] == sent_partial else 0
+                    yield _sse("dialogue", {"offset": offset, "segments": partial[offset:]})
+                    sent_partial = partial
+                if job.get("status") == "completed":
+                    result = await run_in_threadpool(_load_result, job_id)
+                    yield _sse("result", _result_payload(result, dialogue))
+                    break
+                if job.get("status") in ("error", "cancelled"):
+                    break
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=SSE_FALLBACK_POLL_SECONDS)
+                    while not queue.empty():
+                        queue.get_nowait()
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            events.unsubscribe(job_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _cancel_job(job_id: str, file_path: str):
+    # a running job sees the status through its cancel_check and stops there
+    _update_job(job_id, status="cancelled", message="Отменено пользователем")
+    if scheduler.cancel(job_id):
+        # the job never reached a worker, so its upload is removed here
+        _update_job(job_id, step="cancelled")
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
 
 @app.post('/summary-audio/cancel/{job_id}')
 async def summary_audio_cancel(job_id: str):
-    job = JOBS.get(job_id)
+    job = await run_in_threadpool(jobs.get_status, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Задача не найдена")
-    _update_job(job_id, status="cancelled", message="Отменено пользователем")
+    await run_in_threadpool(_cancel_job, job_id, job.get("file_path"))
     return {"success": True}
 
 @app.post('/summary-audio')
@@ -132,20 +439,15 @@ async def summary_audio(
     flag_dialogue: bool = Form(True),
     flag_actions: bool = Form(True),
 ):
-    if not file.filename.lower().endswith((".wav", ".mp3", ".m4a")):
-        raise HTTPException(status_code=400, detail="Неподдерживаемый формат файла")
-    
-    file_path = os.path.join(TEMP_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    job_id = str(uuid.uuid4())
+    file_path = await _save_upload(file, job_id)
 
+    # goes through the same queue as background jobs, so the worker limit holds
+    future = await _enqueue_job(job_id, file_path, flag_summary, flag_dialogue, flag_actions, title=file.filename)
     try: 
-        result = pipeline.run(
-            file_path,
-            flag_summary=flag_summary,
-            flag_dialogue=flag_dialogue,
-            flag_actions=flag_actions,
-        )
+        # shielded: cancelling the request must not cancel the scheduler's
+        # future, that only happens when the job is cancelled while queued
+        result = await asyncio.shield(asyncio.wrap_future(future))
 
         payload = {"success": True}
         if 'summary' in result:
@@ -155,14 +457,21 @@ async def summary_audio(
         if 'actions' in result:
             payload['actions'] = result['actions']
         return JSONResponse(payload)
+    except asyncio.CancelledError:
+        # a job cancelled while queued cancels its future; a cancelled request
+        # (client gone, shutdown) cancels the job, so that it gives up its
+        # worker, and still propagates. Not awaited: the request is already
+        # cancelled. The upload is removed by process_job or _cancel_job.
+        if not future.cancelled():
+            if not future.done():
+                asyncio.get_running_loop().run_in_executor(None, _cancel_job, job_id, file_path)
+            raise
+        return JSONResponse(status_code=500, content={"success": False, "error": "Отменено пользователем"})
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
         )
-    finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 
 @app.post('/resummarize')
@@ -171,12 +480,74 @@ async def resummarize(payload: dict):
     if not text or not isinstance(text, str):
         raise HTTPException(status_code=400, detail="Отсутствует текст для суммаризации")
     try:
-        summary = pipeline.summarizer.full_summarize(text)
+        # {"actions": true}: summary and action items from one combined request
+        # LLM calls block until the response arrives, keep them off the event loop
+        if payload.get('actions'):
+            summary, actions = await run_in_threadpool(pipeline.analyze_text, text)
+            return {"success": True, "summary": summary, "actions": actions}
+        summary = await run_in_threadpool(pipeline.resummarize, text)
         return {"success": True, "summary": summary}
     except Exception as e:
         return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
 
 
+@app.get('/search')
+async def search(q: str, limit: int = 20, offset: int = 0, kind: str = None, call_id: str = None):
+    # Ranked hits over the indexed calls: callId, speaker, start/end (seconds)
+    # of the segment, or the deadline for action items (kind=action)
+    if pipeline.search_index is None:
+        raise HTTPException(status_code=404, detail="Поиск не включен")
+    if kind not in (None, "segment", "action"):
+        raise HTTPException(status_code=400, detail="Неизвестный тип результата")
+    if not 1 <= limit <= 100 or offset < 0:
+        raise HTTPException(status_code=400, detail="Некорректные параметры страницы")
+    hits, total = await run_in_threadpool(pipeline.search_index.search, q, limit=limit, offset=offset,
+                                          kind=kind, call_id=call_id)
+    return {"total": total, "offset": offset, "hits": hits}
+
+
+@app.get('/health')
+async def health():
+    return {"status": "ok"}
+
+@app.get('/ready')
+async def ready():
+    response = {
+        "ready": not warmup_state["running"] and warmup_state["error"] is None,
+        "warmingUp": warmup_state["running"],
+        "error": warmup_state["error"],
+        "models": pipeline.models.status(),
+    }
+    if not response["ready"]:
+        return JSONResponse(status_code=503, content=response)
+    return response
+
+@app.post('/models/warmup')
+async def models_warmup():
+    if warmup_state["running"]:
+        raise HTTPException(status_code=409, detail="Модели уже загружаются")
+    await run_in_threadpool(_warm_up_models)
+    if warmup_state["error"]:
+        raise HTTPException(status_code=500, detail=warmup_state["error"])
+    return {"models": pipeline.models.status()}
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    queue = scheduler.stats()
+    loaded = sum(1 for model in pipeline.models.status().values() if model["loaded"])
+    llm_cache = response_cache.stats()
+    body = metrics.render(gauges={
+        "queue_jobs": queue["queued"],
+        "running_jobs": queue["running"],
+        "loaded_models": loaded,
+        "llm_cache_entries": llm_cache["entries"],
+    }, counters={
+        "llm_cache_hits": llm_cache["hits"],
+        "llm_cache_misses": llm_cache["misses"],
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+
+from summary_pipeline import pipeline_from_env
+from audio_loader import probe_duration
+from process_pool import PipelineProcessPool
+from utils import dialogue_to_markdown, summary_to_markdown
+
+
+# Offline processing of a backlog of recordings:
+#   python batch/run_batch.py data/calls --output data/batch --workers 2
+# Files are scheduled longest first (short ones fill the gaps at the end),
+# results are written as soon as a file is done, and every status change is
+# saved to the manifest. Running the same command again resumes: files marked
+# done are skipped, failed ones are retried with --retry-failed.
+# The pipeline is configured from the same environment variables as the API
+# (summary_pipeline.pipeline_from_env); with SEARCH_INDEX=1 the calls are
+# indexed under the name of their output directory.
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.ogg', '.flac', '.webm', '.aac', '.wma', '.mp4'}
+
+
+class Manifest:
+    # {"files": {path: {"status", "duration", "outputs", "error", "seconds"}}, "runs": [...]}
+    # Written to a temp file and renamed, so an interrupted run never leaves a
+    # truncated manifest behind
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data = {'files': {}, 'runs': []}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.data = json.load(f)
+            self.data.setdefault('runs', [])
+
+    @property
+    def files(self):
+        return self.data['files']
+
+    def add(self, path):
+        self.files.setdefault(str(path), {'status': 'pending'})
+
+    def update(self, path, **fields):
+        with self._lock:
+            self.files[str(path)].update(fields)
+            self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _collect_inputs(source, manifest):
+    # source: a directory (searched recursively), a manifest from an earlier
+    # run, or a text file with one audio path per line
+    source = Path(source)
+    if source.is_dir():
+        for path in sorted(source.rglob('*')):
+            if path.suffix.lower() in AUDIO_EXTENSIONS and path.is_file():
+                manifest.add(path.resolve())
+    elif source.suffix == '.json':
+        if source.resolve() != manifest.path.resolve():
+            with open(source, encoding='utf-8') as f:
+                for path in json.load(f)['files']:
+                    manifest.add(path)
+    else:
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and not line.startswith('#'):
+                    manifest.add(Path(line.strip()).resolve())
+
+
+def _output_dir(output, path):
+    # file stem plus a short hash of the full path: same-named files from
+    # different folders don't overwrite each other
+    path = Path(path)
+    digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]
+    return Path(output) / f"{path.stem}-{digest}"
+
+
+def _write_outputs(result, directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    outputs = {}
+    if result.get('summary') is not None:
+        outputs['summary'] = str(directory / 'summary.md')
+        summary_to_markdown(result['summary'], outputs['summary'])
+    if result.get('dialogue') is not None:
+        outputs['dialogue'] = str(directory / 'dialogue.md')
+        dialogue_to_markdown(result['dialogue'], outputs['dialogue'])
+    outputs['json'] = str(directory / 'result.json')
+    with open(outputs['json'], 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return outputs
+
+
+def _process(runner, path, args, manifest):
+    manifest.update(path, status='running', error=None)
+    started = time.perf_counter()
+    output_dir = _output_dir(args.output, path)
+    timings = {}
+
+    def progress(**event):
+        # the final event carries the job profile, with the decoded audio length
+        timings.update(event.get('timings') or {})
+
+    try:
+        result = runner.run(path, progress_cb=progress, flag_summary=not args.no_summary,
+                            flag_dialogue=not args.no_dialogue, flag_actions=not args.no_actions,
+                            call_id=output_dir.name, title=Path(path).name)
+        outputs = _write_outputs(result, output_dir)
+    except Exception as e:
+        logging.error(f"Failed to process {path}: {e}")
+        manifest.update(path, status='failed', error=str(e), seconds=round(time.perf_counter() - started, 3))
+        return False
+    # probe_duration needs ffprobe; the pipeline knows the length once it has decoded the file
+    duration = timings.get('audio_seconds') or manifest.files[str(path)].get('duration')
+    manifest.update(path, status='done', outputs=outputs, duration=duration,
+                    seconds=round(time.perf_counter() - started, 3))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process a directory or manifest of call recordings')
+    parser.add_argument('input', help='directory with recordings, manifest (.json) or list of paths (one per line)')
+    parser.add_argument('--output', default='data/batch')
+    parser.add_argument('--manifest', help='status manifest (default: <output>/manifest.json)')
+    parser.add_argument('--workers', type=int, default=1, help='files processed at the same time')
+    parser.add_argument('--processes', action='store_true',
+                        help='run the workers as forked processes sharing the models (Linux, CPU only)')
+    parser.add_argument('--retry-failed', action='store_true')
+    parser.add_argument('--no-summary', action='store_true')
+    parser.add_argument('--no-dialogue', action='store_true')
+    parser.add_argument('--no-actions', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    manifest = Manifest(args.manifest or Path(args.output) / 'manifest.json')
+    _collect_inputs(args.input, manifest)
+
+    todo = []
+    for path, entry in manifest.files.items():
+        # 'running' means an earlier run was interrupted on this file
+        if entry['status'] == 'done' and all(os.path.exists(p) for p in entry.get('outputs', {}).values()):
+            continue
+        if entry['status'] == 'failed' and not args.retry_failed:
+            continue
+        if not os.path.exists(path):
+            entry.update(status='failed', error='File not found')
+            continue
+        if entry.get('duration') is None:
+            entry['duration'] = probe_duration(path)
+        entry['status'] = 'pending'
+        todo.append(path)
+    manifest.save()
+    todo.sort(key=lambda path: manifest.files[path]['duration'] or 0, reverse=True)
+    print(f"{len(todo)} of {len(manifest.files)} files to process")
+    if not todo:
+        return
+
+    pipeline = pipeline_from_env()
+    runner = pipeline
+    if args.processes:
+        runner = PipelineProcessPool(pipeline, num_workers=args.workers)
+        runner.start()
+
+    started = time.perf_counter()
+    done = failed = 0
+    audio_seconds = 0.0
+    try:
+        # the executor takes files in submission order: longest first
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='batch') as executor:
+            futures = {executor.submit(_process, runner, path, args, manifest): path for path in todo}
+            try:
+                for future in as_completed(futures):
+                    path = futures[future]
+                    if future.result():
+                        done += 1
+                        audio_seconds += manifest.files[path]['duration'] or 0.0
+                    else:
+                        failed += 1
+                    print(f"[{done + failed}/{len(todo)}] {manifest.files[path]['status']}: {path}")
+            except KeyboardInterrupt:
+                # files already running are finished, the rest stay pending
+                print("Interrupted, waiting for the running files...")
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+    finally:
+        wall = time.perf_counter() - started
+        report = {
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files_done': done,
+            'files_failed': failed,
+            'audio_hours': round(audio_seconds / 3600, 3),
+            'wall_hours': round(wall / 3600, 3),
+            'audio_hours_per_hour': round(audio_seconds / wall, 3) if wall else None,
+        }
+        manifest.data['runs'].append(report)
+        manifest.save()
+        print(f"Done: {done}, failed: {failed}, {report['audio_hours']} h of audio in {report['wall_hours']} h "
+              f"({report['audio_hours_per_hour']} audio hours per hour)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from alignment import merge_diarization_and_recognition, merge_speaker_segments
+
+
+def reference_merge(diarization_segments, recognition_segments):
+    # Quadratic implementation the pipeline used before the sweep-line merge
+    diarization_segments = sorted(diarization_segments, key=lambda x: x['start'])
+    recognition_segments = sorted(recognition_segments, key=lambda x: x['start'])
+
+    merged_segments = []
+    for recognition_segment in recognition_segments:
+        recognition_start, recognition_end = recognition_segment['start'], recognition_segment['end']
+        overlaps = []
+        for diarization_segment in diarization_segments:
+            overlap = min(recognition_end, diarization_segment['end']) - max(recognition_start, diarization_segment['start'])
+            if overlap > 0:
+                overlaps.append((diarization_segment['speaker'], overlap))
+        if overlaps:
+            merged_segments.append({
+                'speaker': max(overlaps, key=lambda x: x[1])[0],
+                'text': recognition_segment['text'],
+                'start': recognition_start,
+                'end': recognition_end})
+    return merged_segments
+
+
+def reference_coalesce(segments):
+    merged_segments = []
+    i = 0
+    while i < len(segments):
+        merged_text = segments[i]['text']
+        end = segments[i]['end']
+        j = i + 1
+        while j < len(segments) and segments[j]['speaker'] == segments[i]['speaker']:
+            merged_text += segments[j]['text']
+            end = segments[j]['end']
+            j += 1
+        merged_segments.append({'speaker': segments[i]['speaker'], 'text': merged_text,
+                                'start': segments[i]['start'], 'end': end})
+        i = j
+    return merged_segments
+
+
+def synthetic_segments(n, n_speakers=4, overlap_prob=0.15, seed=0):
+    # Roughly one diarization turn per 2-3 Whisper segments, with some
+    # overlapping speech and exact-boundary ties to exercise tie-breaking
+    rng = random.Random(seed)
+    recognition, diarization = [], []
+    t = 0.0
+    for i in range(n):
+        duration = round(rng.uniform(0.5, 6.0), 2)
+        recognition.append({'id': i, 'start': t, 'end': t + duration, 'text': f' segment {i}.'})
+        t += duration
+
+    t = 0.0
+    end_of_audio = recognition[-1]['end'] if recognition else 0.0
+    while t < end_of_audio:
+        duration = round(rng.uniform(1.0, 15.0), 1)
+        speaker = f'SPEAKER_{rng.randrange(n_speakers):02d}'
+        diarization.append({'speaker': speaker, 'start': t, 'end': t + duration})
+        if rng.random() < overlap_prob:
+            other = f'SPEAKER_{rng.randrange(n_speakers):02d}'
+            diarization.append({'speaker': other, 'start': t + duration / 2, 'end': t + duration * 1.5})
+        t += duration
+    return diarization, recognition
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def measure(sizes, max_reference=5000):
+    # One row per size; the quadratic reference is skipped above max_reference
+    rows = []
+    for n in sizes:
+        diarization, recognition = synthetic_segments(n, seed=n)
+        merged = merge_diarization_and_recognition(diarization, recognition)
+        sweep_time = timed(lambda: merge_diarization_and_recognition(diarization, recognition, coalesce=True))
+        row = {'segments': n, 'diarization_segments': len(diarization), 'sweep_seconds': sweep_time,
+               'reference_seconds': None, 'speedup': None}
+
+        if n <= max_reference:
+            expected = reference_merge(diarization, recognition)
+            assert merged == expected, f'speaker assignment differs for n={n}'
+            assert merge_speaker_segments(merged) == reference_coalesce(expected), f'coalescing differs for n={n}'
+            row['reference_seconds'] = timed(lambda: reference_coalesce(reference_merge(diarization, recognition)),
+                                             repeat=1)
+            row['speedup'] = row['reference_seconds'] / sweep_time
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speaker/transcript merge micro-benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    parser.add_argument('--max-reference', type=int, default=5000,
+                        help='skip the quadratic reference above this many segments')
+    args = parser.parse_args()
+
+    print(f"{'segments':>10} {'diarization':>12} {'sweep, s':>10} {'reference, s':>13} {'speedup':>8}")
+    for row in measure(args.sizes, args.max_reference):
+        if row['reference_seconds'] is not None:
+            print(f"{row['segments']:>10} {row['diarization_segments']:>12} {row['sweep_seconds']:>10.4f} "
+                  f"{row['reference_seconds']:>13.4f} {row['speedup']:>7.1f}x")
+        else:
+            print(f"{row['segments']:>10} {row['diarization_segments']:>12} {row['sweep_seconds']:>10.4f} "
+                  f"{'-':>13} {'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
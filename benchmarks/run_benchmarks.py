@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+import merge_benchmark
+import stubs
+from synthetic_audio import SAMPLE_RATE, synthetic_call, to_wav_bytes, write_wav
+
+
+# Reproducible performance suite without model weights or an LLM server:
+#   merge     speaker/transcript merge cost vs. number of segments
+#   pipeline  SummaryPipeline.run end to end on synthetic calls with stub or
+#             local stand-in components (the pipeline's own overhead)
+#   api       jobs/s and latency of api/main.py under concurrent clients
+# Results are written as JSON (with the git commit) so that runs can be
+# compared across commits.
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(q):
+        return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+    return {'p50': at(0.5), 'p95': at(0.95), 'max': values[-1], 'mean': statistics.fmean(values)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_merge(args):
+    return merge_benchmark.measure(args.merge_sizes, args.max_reference)
+
+
+def bench_pipeline(args):
+    from summary_pipeline import SummaryPipeline
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in args.kinds:
+            for concurrent, streaming in ((False, False), (True, False), (True, True)):
+                pipeline = stubs.install(SummaryPipeline(concurrent=concurrent, streaming=streaming,
+                                                         cache_enabled=False), kind,
+                                         asr_rtf=args.asr_rtf, diarization_rtf=args.diarization_rtf,
+                                         llm_latency=args.llm_latency)
+                for duration in args.durations:
+                    waveform, truth = synthetic_call(duration, n_speakers=args.speakers, seed=int(duration))
+                    path = os.path.join(tmp, f'call_{int(duration)}.wav')
+                    write_wav(path, waveform)
+
+                    walls, timings = [], None
+                    for _ in range(args.repeat):
+                        captured = {}
+                        started = time.perf_counter()
+                        result = pipeline.run(path, progress_cb=lambda **event: captured.update(event))
+                        walls.append(time.perf_counter() - started)
+                        timings = captured.get('timings')
+
+                    rows.append({
+                        'kind': kind,
+                        'concurrent': concurrent,
+                        'streaming': streaming,
+                        'audio_seconds': len(waveform) / SAMPLE_RATE,
+                        'true_speakers': len({segment['speaker'] for segment in truth}),
+                        'found_speakers': len({segment['speaker'] for segment in result['dialogue']}),
+                        'dialogue_segments': len(result['dialogue']),
+                        'wall_seconds': _percentiles(walls),
+                        'real_time_factor': min(walls) / (len(waveform) / SAMPLE_RATE),
+                        'timings': timings,
+                    })
+    return rows
+
+
+def _load_api(args):
+    # api/main.py configures itself from the environment at import time
+    os.environ.update({
+        'JOB_STORE': 'memory',
+        'JOB_WORKERS': str(args.api_workers),
+        'JOB_QUEUE_SIZE': str(args.api_jobs + args.api_clients),
+        'PIPELINE_PROCESSES': '0',
+        'WARMUP_MODELS': '0',
+    })
+    spec = importlib.util.spec_from_file_location('api_main', ROOT / 'api' / 'main.py')
+    main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(main)
+    main.pipeline.cache = None
+    stubs.install(main.pipeline, 'stub', asr_rtf=args.asr_rtf, diarization_rtf=args.diarization_rtf,
+                  llm_latency=args.llm_latency)
+    return main
+
+
+async def _api_load(main, audio, args):
+    import httpx
+
+    submit_latency, job_latency, status_latency, errors = [], [], [], 0
+    semaphore = asyncio.Semaphore(args.api_clients)
+
+    async def one_job(client):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post('/summary-audio/start', files={'file': ('call.wav', audio, 'audio/wav')})
+            submit_latency.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+                return
+            job_id = response.json()['jobId']
+            while True:
+                polled = time.perf_counter()
+                status = (await client.get(f'/summary-audio/status/{job_id}',
+                                           params={'include_result': 'false'})).json()
+                status_latency.append(time.perf_counter() - polled)
+                if status['status'] in ('completed', 'error', 'cancelled'):
+                    break
+                await asyncio.sleep(args.api_poll)
+            if status['status'] != 'completed':
+                errors += 1
+            job_latency.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one_job(client) for _ in range(args.api_jobs)))
+        elapsed = time.perf_counter() - started
+    return elapsed, submit_latency, job_latency, status_latency, errors
+
+
+def bench_api(args):
+    main = _load_api(args)
+    waveform, _ = synthetic_call(args.api_duration, n_speakers=args.speakers, seed=1)
+    audio = to_wav_bytes(waveform)
+    try:
+        elapsed, submit_latency, job_latency, status_latency, errors = asyncio.run(_api_load(main, audio, args))
+    finally:
+        main.scheduler.shutdown()
+    audio_seconds = args.api_jobs * len(waveform) / SAMPLE_RATE
+    return {
+        'jobs': args.api_jobs,
+        'clients': args.api_clients,
+        'workers': args.api_workers,
+        'audio_seconds_per_job': len(waveform) / SAMPLE_RATE,
+        'elapsed_seconds': elapsed,
+        'jobs_per_second': args.api_jobs / elapsed,
+        'audio_hours_per_hour': audio_seconds / elapsed,
+        'errors': errors,
+        'submit_latency_seconds': _percentiles(submit_latency),
+        'job_latency_seconds': _percentiles(job_latency),
+        'status_latency_seconds': _percentiles(status_latency),
+    }
+
+
+SUITES = {
+    'merge': bench_merge,
+    'pipeline': bench_pipeline,
+    'api': bench_api,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark suite (synthetic audio, stub models)')
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--speakers', type=int, default=3)
+    parser.add_argument('--asr-rtf', type=float, default=0.0, help='simulated ASR time per audio second')
+    parser.add_argument('--diarization-rtf', type=float, default=0.0, help='simulated diarization time per audio second')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='simulated seconds per LLM request')
+
+    parser.add_argument('--merge-sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    parser.add_argument('--max-reference', type=int, default=5000)
+
+    parser.add_argument('--durations', type=float, nargs='+', default=[60, 300, 900])
+    parser.add_argument('--kinds', nargs='+', choices=['stub', 'local'], default=['stub', 'local'])
+    parser.add_argument('--repeat', type=int, default=3)
+
+    parser.add_argument('--api-jobs', type=int, default=20)
+    parser.add_argument('--api-clients', type=int, default=4)
+    parser.add_argument('--api-workers', type=int, default=2)
+    parser.add_argument('--api-duration', type=float, default=60)
+    parser.add_argument('--api-poll', type=float, default=0.05)
+    args = parser.parse_args()
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': vars(args),
+        'results': {},
+    }
+    for name in args.suites:
+        print(f"Running '{name}' benchmark...")
+        started = time.perf_counter()
+        report['results'][name] = SUITES[name](args)
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import json
+import time
+import types
+
+import numpy as np
+
+from audio_loader import SAMPLE_RATE, load_audio
+from vad import VoiceActivityDetector
+from llm_summarizer import BaseSummarizer
+from actions_extractor import BaseActionExtractor
+
+
+# Drop-in replacements for the model-backed pipeline components.
+#
+# Stubs do no signal processing: they produce fixed-shape output from the
+# audio length and optionally sleep `real_time_factor` x audio duration (or
+# `latency` per LLM request) to stand in for model time. With zero latency
+# they isolate the pipeline's own overhead.
+#
+# Local stand-ins do real, model-free work on the audio (energy VAD, pitch
+# tracking) so that CPU-bound stages have a realistic shape without weights.
+
+
+def _waveform(audio):
+    return audio if isinstance(audio, np.ndarray) else load_audio(audio)
+
+
+class _Diarization:
+    # Minimal pyannote Annotation: itertracks(yield_label=True)
+    def __init__(self, segments):
+        self.segments = segments
+
+    def itertracks(self, yield_label=False):
+        for segment in self.segments:
+            turn = types.SimpleNamespace(start=segment['start'], end=segment['end'])
+            yield (turn, None, segment['speaker']) if yield_label else (turn, None)
+
+
+class StubSpeechRecognizer:
+    def __init__(self, segment_seconds=5.0, real_time_factor=0.0, language='ru'):
+        self.segment_seconds = segment_seconds
+        self.real_time_factor = real_time_factor
+        self.language = language
+
+    def settings(self, streaming=False):
+        return {'model': 'stub', 'segment_seconds': self.segment_seconds}
+
+    def stream_segments(self, audio, window_hook=None):
+        duration = len(_waveform(audio)) / SAMPLE_RATE
+        t, i = 0.0, 0
+        while t < duration:
+            end = min(t + self.segment_seconds, duration)
+            time.sleep((end - t) * self.real_time_factor)
+            yield {'id': i, 'start': t, 'end': end, 'text': f' Фраза номер {i}.'}
+            if window_hook is not None:
+                window_hook(end, duration)
+            t, i = end, i + 1
+
+    def speech_to_text(self, audio, window_hook=None):
+        segments = list(self.stream_segments(audio, window_hook))
+        return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
+
+
+class StubSpeakerIdentifier:
+    model_name = 'stub'
+    min_speakers = 1
+    max_speakers = 5
+    window_seconds = None
+    window_overlap = None
+
+    def __init__(self, turn_seconds=7.0, n_speakers=2, real_time_factor=0.0):
+        self.turn_seconds = turn_seconds
+        self.n_speakers = n_speakers
+        self.real_time_factor = real_time_factor
+
+    def identify_speakers(self, audio, hook=None):
+        duration = len(_waveform(audio)) / SAMPLE_RATE
+        time.sleep(duration * self.real_time_factor)
+        segments = []
+        t = 0.0
+        while t < duration:
+            end = min(t + self.turn_seconds, duration)
+            segments.append({'speaker': f'SPEAKER_{len(segments) % self.n_speakers:02d}', 'start': t, 'end': end})
+            t = end
+        return _Diarization(segments)
+
+    def is_single_speaker(self, waveform, regions, **kwargs):
+        return self.n_speakers == 1
+
+    def get_segments_info(self, diarization):
+        return [{'speaker': speaker, 'start': turn.start, 'end': turn.end}
+                for turn, _, speaker in diarization.itertracks(yield_label=True)]
+
+
+def _pitch(frame, sample_rate=SAMPLE_RATE, fmin=70.0, fmax=400.0):
+    # Autocorrelation pitch estimate of one voiced frame
+    frame = frame - frame.mean()
+    spectrum = np.fft.rfft(frame, n=2 * len(frame))
+    autocorr = np.fft.irfft(np.abs(spectrum) ** 2)[:len(frame)]
+    low, high = int(sample_rate / fmax), int(sample_rate / fmin)
+    lag = low + int(np.argmax(autocorr[low:high]))
+    return sample_rate / lag
+
+
+class LocalSpeechRecognizer(StubSpeechRecognizer):
+    # One "utterance" per energy-VAD speech region, split to at most
+    # segment_seconds like Whisper's segments
+    def __init__(self, segment_seconds=10.0, language='ru'):
+        super().__init__(segment_seconds=segment_seconds, language=language)
+        self.vad = VoiceActivityDetector('energy', min_silence=0.25, pad=0.05)
+
+    def settings(self, streaming=False):
+        return {'model': 'local-vad', 'segment_seconds': self.segment_seconds}
+
+    def stream_segments(self, audio, window_hook=None):
+        waveform = _waveform(audio)
+        duration = len(waveform) / SAMPLE_RATE
+        i = 0
+        for start, end in self.vad.detect(waveform):
+            t = start
+            while t < end:
+                stop = min(t + self.segment_seconds, end)
+                yield {'id': i, 'start': t, 'end': stop, 'text': f' Реплика {i} ({stop - t:.1f} с).'}
+                t, i = stop, i + 1
+            if window_hook is not None:
+                window_hook(end, duration)
+
+
+class LocalSpeakerIdentifier(StubSpeakerIdentifier):
+    # Energy VAD, a pitch estimate per window and 1-D clustering of the
+    # pitches: recovers the speakers of benchmarks.synthetic_audio recordings
+    model_name = 'local-pitch'
+
+    def __init__(self, window=0.25, cluster_gap_hz=15.0):
+        super().__init__()
+        self.window = window
+        self.cluster_gap_hz = cluster_gap_hz
+        self.vad = VoiceActivityDetector('energy', min_silence=0.25, pad=0.0)
+
+    def _cluster(self, pitches):
+        # speakers are split at gaps in the sorted pitches
+        order = np.sort(pitches)
+        bounds = [(a + b) / 2 for a, b in zip(order, order[1:]) if b - a > self.cluster_gap_hz]
+        return np.searchsorted(bounds, pitches)
+
+    def identify_speakers(self, audio, hook=None):
+        waveform = _waveform(audio)
+        length = int(self.window * SAMPLE_RATE)
+        windows = []
+        for start, end in self.vad.detect(waveform):
+            for t in np.arange(start, end - self.window / 2, self.window):
+                frame = waveform[int(t * SAMPLE_RATE):int(t * SAMPLE_RATE) + length]
+                windows.append((float(t), float(min(t + self.window, end)), _pitch(frame)))
+            if hook is not None:
+                hook()
+        labels = self._cluster(np.array([pitch for _, _, pitch in windows]))
+
+        # consecutive windows of one cluster form a turn; speaker names go by
+        # order of first appearance, like pyannote's
+        names, segments = {}, []
+        for (start, end, _), label in zip(windows, labels):
+            speaker = names.setdefault(int(label), f'SPEAKER_{len(names):02d}')
+            if segments and segments[-1]['speaker'] == speaker and start - segments[-1]['end'] < 0.3:
+                segments[-1]['end'] = end
+            else:
+                segments.append({'speaker': speaker, 'start': start, 'end': end})
+        return _Diarization(segments)
+
+
+class StubSummarizer(BaseSummarizer):
+    def __init__(self, latency=0.0, chunk_tokens=6000, max_parallel=2):
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = 'stub'
+        self.latency = latency
+
+    def _invoke(self, prompt):
+        time.sleep(self.latency)
+        return (f"## Цель\nСтаб-резюме.\n\n## Ключевые моменты\n- Промпт: {len(prompt)} символов\n\n"
+                f"## Действия и задачи\n- Нет\n\n## Резюме\nСинтетический созвон.")
+
+
+class StubActionExtractor(BaseActionExtractor):
+    def __init__(self, latency=0.0, chunk_tokens=6000, max_parallel=2):
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = 'stub'
+        self.latency = latency
+
+    def _invoke(self, prompt):
+        time.sleep(self.latency)
+        return json.dumps({'actions': [{'title': 'Подготовить отчёт', 'deadline': '22.08',
+                                        'responsible': 'SPEAKER_00', 'details': None}]},
+                          ensure_ascii=False)
+
+
+def install(pipeline, kind='stub', asr_rtf=0.0, diarization_rtf=0.0, llm_latency=0.0):
+    # Replaces the model-backed components of a SummaryPipeline in place
+    if kind == 'local':
+        pipeline.speech_recognizer = LocalSpeechRecognizer()
+        pipeline.speaker_identifier = LocalSpeakerIdentifier()
+    elif kind == 'stub':
+        pipeline.speech_recognizer = StubSpeechRecognizer(real_time_factor=asr_rtf)
+        pipeline.speaker_identifier = StubSpeakerIdentifier(real_time_factor=diarization_rtf)
+    else:
+        raise ValueError(f"Unknown stand-in kind: {kind}")
+    pipeline.summarizer = StubSummarizer(latency=llm_latency)
+    pipeline.actions_extractor = StubActionExtractor(latency=llm_latency)
+    return pipeline
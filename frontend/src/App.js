@@ -5,8 +5,20 @@ import Footer from './components/Footer';
 import AudioUpload from './components/AudioUpload';
 import Results from './components/Results';
 import LoadingSpinner from './components/LoadingSpinner';
+import PartialDialogue from './components/PartialDialogue';
 import './index.css';
 
+// Длинные диалоги приходят не целиком с результатом, а страницами
+// в колоночном формате: таблица спикеров + параллельные массивы
+const DIALOGUE_PAGE_SIZE = 500;
+
+const fromColumnar = (columns) => columns.text.map((text, i) => ({
+  speaker: columns.speakers[columns.speaker[i]],
+  start: columns.start[i],
+  end: columns.end[i],
+  text,
+}));
+
 function App() {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -15,6 +27,7 @@ function App() {
   const [serverStep, setServerStep] = useState(null);
   const [serverMessage, setServerMessage] = useState(null);
   const [serverProgress, setServerProgress] = useState(0);
+  const [partialDialogue, setPartialDialogue] = useState([]);
   const pollRef = useRef(null);
   const audioUrlRef = useRef(null);
   const cancellingRef = useRef(false);
@@ -45,6 +58,7 @@ function App() {
     setServerStep(null);
     setServerMessage(null);
     setServerProgress(0);
+    setPartialDialogue([]);
 
     setJobId(newJobId);
     setLoading(true);
@@ -78,48 +92,110 @@ function App() {
   useEffect(() => {
     if (!jobId) return;
     if (pollRef.current) clearInterval(pollRef.current);
-    pollRef.current = setInterval(async () => {
+
+    let finished = false;
+    let source = null;
+
+    const stop = () => {
+      finished = true;
+      if (source) source.close();
+      if (pollRef.current) clearInterval(pollRef.current);
+    };
+
+    const handleStatus = (data) => {
+      setServerStep(data.step || null);
+      setServerMessage(data.message || null);
+      setServerProgress(typeof data.progress === 'number' ? data.progress : 0);
+      if (data.status === 'error') {
+        setError(data.error || 'Ошибка обработки');
+        setJobId(null);
+        setLoading(false);
+        stop();
+      } else if (data.status === 'cancelled') {
+        setServerStep('cancelled');
+        setServerMessage('Отменено пользователем');
+        setJobId(null);
+        setLoading(false);
+        stop();
+        if (audioUrlRef.current) {
+          try { URL.revokeObjectURL(audioUrlRef.current); } catch (_) {}
+          audioUrlRef.current = null;
+        }
+      }
+    };
+
+    const loadDialogue = async (total) => {
       try {
-        const { data } = await axios.get(`/summary-audio/status/${jobId}`);
-        if (data) {
-          setServerStep(data.step || null);
-          setServerMessage(data.message || null);
-          setServerProgress(typeof data.progress === 'number' ? data.progress : 0);
-          if (data.status === 'completed' && data.success) {
-            const r = { audioUrl: audioUrlRef.current };
-            if (typeof data.summary !== 'undefined') r.summary = data.summary;
-            if (typeof data.dialogue !== 'undefined') r.dialogue = data.dialogue;
-            if (typeof data.actions !== 'undefined') r.actions = data.actions;
-            setResults(r);
-            setJobId(null);
-            setLoading(false);
-            clearInterval(pollRef.current);
-          } else if (data.status === 'error') {
-            setError(data.error || 'Ошибка обработки');
-            setJobId(null);
-            setLoading(false);
-            clearInterval(pollRef.current);
-          } else if (data.status === 'cancelled') {
-            setServerStep('cancelled');
-            setServerMessage('Отменено пользователем');
-            setJobId(null);
-            setLoading(false);
-            clearInterval(pollRef.current);
-            if (audioUrlRef.current) {
-              try { URL.revokeObjectURL(audioUrlRef.current); } catch (_) {}
-              audioUrlRef.current = null;
-            }
-          }
+        for (let offset = 0; offset < total; offset += DIALOGUE_PAGE_SIZE) {
+          const { data } = await axios.get(`/summary-audio/dialogue/${jobId}`, { params: { offset, limit: DIALOGUE_PAGE_SIZE } });
+          const page = fromColumnar(data.dialogue);
+          // результаты могли сбросить, пока грузилась страница
+          setResults((prev) => prev && { ...prev, dialogue: (prev.dialogue || []).concat(page) });
         }
       } catch (e) {
-        setError('Ошибка при получении статуса');
-        setJobId(null);
-        setLoading(false);
-        if (pollRef.current) clearInterval(pollRef.current);
+        setError('Ошибка при загрузке диалога');
+      }
+    };
+
+    const handleResult = (data) => {
+      const r = { audioUrl: audioUrlRef.current };
+      if (typeof data.summary !== 'undefined') r.summary = data.summary;
+      if (typeof data.dialogue !== 'undefined') r.dialogue = data.dialogue;
+      if (typeof data.dialogueCount !== 'undefined' && typeof data.dialogue === 'undefined') r.dialogue = [];
+      if (typeof data.actions !== 'undefined') r.actions = data.actions;
+      setResults(r);
+      setJobId(null);
+      setLoading(false);
+      stop();
+      if (typeof data.dialogueCount !== 'undefined' && typeof data.dialogue === 'undefined') {
+        loadDialogue(data.dialogueCount);
       }
-    }, 400);
+    };
+
+    // Запасной вариант, если поток событий недоступен: опрос статуса,
+    // результат запрашивается один раз после завершения
+    const startPolling = () => {
+      pollRef.current = setInterval(async () => {
+        try {
+          const { data } = await axios.get(`/summary-audio/status/${jobId}`, { params: { include_result: false, include_partial: true } });
+          if (!data || finished) return;
+          handleStatus(data);
+          if (data.partialDialogue) setPartialDialogue(data.partialDialogue);
+          if (data.status === 'completed') {
+            clearInterval(pollRef.current);
+            const { data: result } = await axios.get(`/summary-audio/result/${jobId}`, { params: { dialogue: 'none' } });
+            handleResult(result);
+          }
+        } catch (e) {
+          setError('Ошибка при получении статуса');
+          setJobId(null);
+          setLoading(false);
+          stop();
+        }
+      }, 400);
+    };
+
+    if (typeof window.EventSource === 'function') {
+      source = new EventSource(`/summary-audio/events/${jobId}?dialogue=none`);
+      source.addEventListener('progress', (e) => handleStatus(JSON.parse(e.data)));
+      source.addEventListener('result', (e) => handleResult(JSON.parse(e.data)));
+      // Новые реплики начиная с offset (0 — весь диалог заново, например когда определились спикеры)
+      source.addEventListener('dialogue', (e) => {
+        const { offset, segments } = JSON.parse(e.data);
+        setPartialDialogue((prev) => prev.slice(0, offset).concat(segments));
+      });
+      source.onerror = () => {
+        if (finished) return;
+        source.close();
+        startPolling();
+      };
+    } else {
+      startPolling();
+    }
 
     return () => {
+      finished = true;
+      if (source) source.close();
       if (pollRef.current) clearInterval(pollRef.current);
     };
   }, [jobId]);
@@ -158,6 +234,7 @@ function App() {
               flags={(results && results.__flags) || { summary: true, dialogue: true, actions: true }}
             />
             <button onClick={handleCancel} className="btn-secondary mt-6">Отменить</button>
+            <PartialDialogue segments={partialDialogue} />
           </div>
         )}
 
@@ -67,6 +67,8 @@ const AudioUpload = ({ onResults, onError, onLoading, onJobStart }) => {
           errorMessage = error.response.data.detail || 'Неверный формат файла';
         } else if (error.response.status === 413) {
           errorMessage = 'Файл слишком большой';
+        } else if (error.response.status === 429) {
+          errorMessage = error.response.data.detail || 'Сервер перегружен, попробуйте позже';
         } else if (error.response.status === 500) {
           errorMessage = 'Ошибка сервера при обработке файла';
         }
@@ -0,0 +1,41 @@
+import React, { useEffect, useRef } from 'react';
+import { User } from 'lucide-react';
+
+// Реплики, распознанные до завершения обработки (режим PIPELINE_STREAMING).
+// Спикеры появляются, когда закончится их определение.
+const PartialDialogue = ({ segments }) => {
+  const listRef = useRef(null);
+
+  useEffect(() => {
+    if (listRef.current) listRef.current.scrollTop = listRef.current.scrollHeight;
+  }, [segments]);
+
+  if (!segments || segments.length === 0) return null;
+
+  const formatTime = (seconds) => {
+    const minutes = Math.floor(seconds / 60);
+    const remainingSeconds = Math.floor(seconds % 60);
+    return `${minutes.toString().padStart(2, '0')}:${remainingSeconds.toString().padStart(2, '0')}`;
+  };
+
+  return (
+    <div className="card w-full max-w-3xl mt-8">
+      <div className="text-sm text-gray-600 mb-3">Уже распознано реплик: {segments.length}</div>
+      <div className="space-y-2 max-h-[40vh] overflow-y-auto text-left" ref={listRef}>
+        {segments.map((segment, index) => (
+          <div key={index} className="p-3 bg-white rounded-lg border border-gray-200">
+            <div className="flex justify-between items-center mb-1 text-xs text-gray-500">
+              <span className="inline-flex items-center gap-1">
+                <User className="h-3 w-3" /> {segment.speaker || 'Спикер определяется...'}
+              </span>
+              <span>{formatTime(segment.start)} – {formatTime(segment.end)}</span>
+            </div>
+            <div className="text-gray-800 leading-relaxed">{segment.text}</div>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
+
+export default PartialDialogue;
@@ -1,11 +1,12 @@
+import re
 from typing import List, Optional
 from abc import ABC, abstractmethod
+from functools import cached_property
 
 from pydantic import BaseModel, Field
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import PromptTemplate
-from langchain_ollama.llms import OllamaLLM
-from langchain_openai import ChatOpenAI
+
+from chunking import chunk_transcript, estimate_tokens, map_parallel
+from llm_client import get_client
 
 
 class Action(BaseModel):
@@ -24,9 +25,32 @@ class ExtractedActions(BaseModel):
                                    description='Извлеченные из созвона действия(задачи)')
     
 
+def _action_key(action):
+    return re.sub(r'[^\w]+', ' ', action.title.casefold()).strip()
+
+
+def deduplicate_actions(actions):
+    # The same task is often mentioned in several chunks of a long call:
+    # keep the first mention and fill its missing fields from the later ones
+    merged = {}
+    for action in actions:
+        key = _action_key(action)
+        if key not in merged:
+            merged[key] = action.copy()
+            continue
+        kept = merged[key]
+        for field in ('deadline', 'responsible', 'details'):
+            if not getattr(kept, field) and getattr(action, field):
+                setattr(kept, field, getattr(action, field))
+    return list(merged.values())
+
+
 class BaseActionExtractor(ABC):
-    def __init__(self):
-        self.parser = PydanticOutputParser(pydantic_object=ExtractedActions)
+    def __init__(self, chunk_tokens=None, max_parallel=1):
+        # Transcripts over chunk_tokens are split, chunks are processed in
+        # parallel (up to max_parallel requests) and the actions deduplicated
+        self.chunk_tokens = chunk_tokens
+        self.max_parallel = max_parallel
         self.template = """
         Ты интеллектуальный ассистент для извлечения действий и задач из текста созвона.
 
@@ -49,7 +73,17 @@ class BaseActionExtractor(ABC):
         {format_instructions}
         """
 
-        self.prompt = PromptTemplate(
+    # langchain is imported on first use: it is most of the import time of
+    # the pipeline, and the API starts long before the first LLM request
+    @cached_property
+    def parser(self):
+        from langchain.output_parsers import PydanticOutputParser
+        return PydanticOutputParser(pydantic_object=ExtractedActions)
+
+    @cached_property
+    def prompt(self):
+        from langchain.prompts import PromptTemplate
+        return PromptTemplate(
             template=self.template,
             input_variables=['text'],
             partial_variables={'format_instructions': self.parser.get_format_instructions()}
@@ -59,37 +93,44 @@ class BaseActionExtractor(ABC):
     def _invoke(self, prompt):
         pass
 
-    def extract(self, text):
+    def _extract_one(self, text):
+        prompt = self.prompt.format(text=text)
+        output = self._invoke(prompt)
+        return self.parser.parse(output)
+
+    def extract(self, text, turns=None):
         try:
-            prompt = self.prompt.format(text=text)
-            output = self._invoke(prompt)
-            return self.parser.parse(output)
+            if not self.chunk_tokens or estimate_tokens(text) <= self.chunk_tokens:
+                return self._extract_one(text)
+            chunks = chunk_transcript(text, self.chunk_tokens, turns)
+            results = map_parallel(self._extract_one, chunks, self.max_parallel)
+            actions = [action for result in results for action in result.actions]
+            return ExtractedActions(actions=deduplicate_actions(actions))
         except Exception as e:
             raise ValueError(f"Validation error: {str(e)}")
 
 
 class OllamaExtractor(BaseActionExtractor):
-    def __init__(self, model_name='llama3'):
-        super().__init__()
-        self.model = OllamaLLM(model=model_name, 
-                               temperature=0.2)
+    def __init__(self, model_name='llama3', chunk_tokens=3000, max_parallel=1):
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = model_name
+        self.client = get_client('ollama', model_name, temperature=0.2)
         
 
     def _invoke(self, prompt):
-        return self.model.invoke(prompt)
+        return self.client.invoke(prompt)
     
 
 class OpenAiExtractor(BaseActionExtractor):
     def __init__(self, model_name="openai/gpt-oss-20b", 
                  base_url="http://localhost:1234/v1", 
-                 api_key="lm-studio"
+                 api_key="lm-studio",
+                 chunk_tokens=6000,
+                 max_parallel=2
                  ):
-        super().__init__()
-        self.model = ChatOpenAI(
-            model=model_name,
-            base_url = base_url,
-            api_key = api_key,
-            temperature=0.2)
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = model_name
+        self.client = get_client('openai', model_name, base_url=base_url, api_key=api_key, temperature=0.2)
 
     def _invoke(self, prompt):
-        return self.model.invoke(prompt).content
\ No newline at end of file
+        return self.client.invoke(prompt)
\ No newline at end of file
@@ -0,0 +1,60 @@
+def _assign_speakers(diarization_segments, recognition_segments):
+    # Sweep over both lists sorted by start: `active` holds the diarization
+    # segments (in sorted order) that may still overlap the current or any
+    # later recognition segment, so each segment enters and leaves it once.
+    diarization_segments = sorted(diarization_segments, key=lambda x: x['start'])
+    recognition_segments = sorted(recognition_segments, key=lambda x: x['start'])
+
+    active = []
+    next_idx = 0
+    for recognition_segment in recognition_segments:
+        recognition_start, recognition_end = recognition_segment['start'], recognition_segment['end']
+
+        while next_idx < len(diarization_segments) and diarization_segments[next_idx]['start'] < recognition_end:
+            active.append(diarization_segments[next_idx])
+            next_idx += 1
+        active = [d for d in active if d['end'] > recognition_start]
+
+        speaker, best_overlap = None, 0
+        for diarization_segment in active:
+            overlap = min(recognition_end, diarization_segment['end']) - max(recognition_start, diarization_segment['start'])
+            # strict comparison keeps the earliest segment on equal overlaps
+            if overlap > best_overlap:
+                speaker, best_overlap = diarization_segment['speaker'], overlap
+
+        if speaker is not None:
+            yield speaker, recognition_segment
+
+
+def merge_speaker_segments(segments):
+    merged_segments = []
+    texts = []
+    for segment in segments:
+        if merged_segments and merged_segments[-1]['speaker'] == segment['speaker']:
+            texts.append(segment['text'])
+            merged_segments[-1]['end'] = segment['end']
+            continue
+        if merged_segments:
+            merged_segments[-1]['text'] = ''.join(texts)
+        texts = [segment['text']]
+        merged_segments.append({
+            'speaker': segment['speaker'],
+            'text': None,
+            'start': segment['start'],
+            'end': segment['end']
+        })
+    if merged_segments:
+        merged_segments[-1]['text'] = ''.join(texts)
+
+    return merged_segments
+
+
+def merge_diarization_and_recognition(diarization_segments, recognition_segments, coalesce=False):
+    assigned = ({'speaker': speaker,
+                 'text': segment['text'],
+                 'start': segment['start'],
+                 'end': segment['end']}
+                for speaker, segment in _assign_speakers(diarization_segments, recognition_segments))
+    if coalesce:
+        return merge_speaker_segments(assigned)
+    return list(assigned)
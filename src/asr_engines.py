@@ -0,0 +1,194 @@
+import importlib
+import logging
+import threading
+import types
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+import tqdm
+import whisper
+from whisper.audio import FRAMES_PER_SECOND
+
+from audio_loader import SAMPLE_RATE
+from batched_asr import BatchedWhisperService
+
+
+# whisper.transcribe has no per-window callback, but it advances a tqdm bar
+# once per decoded 30-second window. Swapping in this subclass gives a hook
+# between windows (used for cancellation and progress) in the calling thread.
+_window_hooks = threading.local()
+# whisper.transcribe's tqdm is replaced only while at least one
+# WhisperEngine.transcribe is running, see _window_hook
+_patch_lock = threading.Lock()
+_patch_users = 0
+_original_tqdm = None
+
+
+class _WindowHookTqdm(tqdm.tqdm):
+    # The bar is disabled unless verbose, and a disabled tqdm doesn't count
+    # (self.n stays 0), so the frames done are counted here
+    def __init__(self, *args, **kwargs):
+        self._frames_done = 0
+        super().__init__(*args, **kwargs)
+
+    def update(self, n=1):
+        result = super().update(n)
+        self._frames_done += n
+        hook = getattr(_window_hooks, 'hook', None)
+        if hook is not None:
+            hook(self._frames_done / FRAMES_PER_SECOND, self.total / FRAMES_PER_SECOND)
+        return result
+
+
+@contextmanager
+def _window_hook(window_hook):
+    # Installs _WindowHookTqdm in whisper.transcribe for the duration of the
+    # block and routes its updates to window_hook in this thread. The module
+    # is shared, so the patch is counted and removed by the last user.
+    global _patch_users, _original_tqdm
+    module = importlib.import_module('whisper.transcribe')
+    with _patch_lock:
+        if _patch_users == 0:
+            _original_tqdm = module.tqdm
+            module.tqdm = types.SimpleNamespace(tqdm=_WindowHookTqdm)
+        _patch_users += 1
+    _window_hooks.hook = window_hook
+    try:
+        yield
+    finally:
+        _window_hooks.hook = None
+        with _patch_lock:
+            _patch_users -= 1
+            if _patch_users == 0:
+                module.tqdm = _original_tqdm
+
+
+def window_bounds(waveform, window_seconds, search_seconds=5.0, frame_seconds=0.1, sample_rate=SAMPLE_RATE):
+    # Splits the waveform into windows of about window_seconds (sample ranges).
+    # Each cut is moved to the quietest frame of the last search_seconds of
+    # its window, so words are rarely split between two windows.
+    window, search, frame = (int(window_seconds * sample_rate), int(search_seconds * sample_rate),
+                             int(frame_seconds * sample_rate))
+    bounds, start = [], 0
+    while len(waveform) - start > window:
+        low, target = max(start + frame, start + window - search), start + window
+        frames = (target - low) // frame
+        energy = np.square(waveform[low:low + frames * frame].reshape(frames, frame)).mean(axis=1)
+        cut = low + int(np.argmin(energy)) * frame + frame // 2 if frames else target
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, len(waveform)))
+    return bounds
+
+
+def _shifted_hook(window_hook, offset, total):
+    # window_hook for one window of stream(): times within the window are
+    # reported as times within the whole recording
+    if window_hook is None:
+        return None
+
+    def hook(done, _):
+        window_hook(offset + done, total)
+    return hook
+
+
+class BaseASREngine(ABC):
+    # transcribe() returns {'text': str, 'segments': [{'id', 'start', 'end', 'text', ...}]}
+    # for a 16 kHz mono float32 waveform. window_hook(done_seconds, total_seconds)
+    # is called as decoding advances; raising from it aborts the transcription.
+    @abstractmethod
+    def transcribe(self, waveform, language, window_hook=None):
+        pass
+
+    def stream(self, waveform, language, window_hook=None, window_seconds=60):
+        # Yields segments as they are decoded. Whisper only returns at the end
+        # of transcribe(), so the audio is transcribed window by window (each
+        # window without the text of the previous one as context)
+        total = len(waveform) / SAMPLE_RATE
+        for start, end in window_bounds(waveform, window_seconds):
+            offset = start / SAMPLE_RATE
+            hook = _shifted_hook(window_hook, offset, total)
+            result = self.transcribe(waveform[start:end], language, window_hook=hook)
+            for segment in result['segments']:
+                yield {**segment, 'start': segment['start'] + offset, 'end': segment['end'] + offset}
+
+
+class WhisperEngine(BaseASREngine):
+    def __init__(self, model_size='small'):
+        self.model_size = model_size
+        logging.info(f"Loading Whisper model ({self.model_size})")
+        self.model = whisper.load_model(self.model_size)
+
+    def transcribe(self, waveform, language, window_hook=None):
+        with _window_hook(window_hook):
+            return self.model.transcribe(waveform, language=language)
+
+
+class BatchedWhisperEngine(WhisperEngine):
+    # Same model as WhisperEngine, but windows of all concurrent jobs (and all
+    # windows of one long file) are decoded together in padded batches
+    def __init__(self, model_size='small', max_batch_size=8, max_wait_ms=50):
+        super().__init__(model_size)
+        self.max_batch_size = max_batch_size
+        self.service = BatchedWhisperService(self.model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def transcribe(self, waveform, language, window_hook=None):
+        return self.service.transcribe(waveform, language, window_hook=window_hook)
+
+    def close(self):
+        self.service.close()
+
+
+class FasterWhisperEngine(BaseASREngine):
+    # CTranslate2 backend with int8 weights: several times faster than fp32
+    # PyTorch Whisper on CPU. Requires the optional `faster-whisper` package.
+    def __init__(self, model_size='small', compute_type='int8', beam_size=1, cpu_threads=0):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("ASR engine 'faster-whisper' requires: pip install faster-whisper") from e
+
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        logging.info(f"Loading faster-whisper model ({self.model_size}, {self.compute_type})")
+        self.model = WhisperModel(model_size, device='cpu', compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def _segments(self, waveform, language, window_hook=None):
+        segments_iter, info = self.model.transcribe(waveform, language=language, beam_size=self.beam_size)
+        total = len(waveform) / SAMPLE_RATE
+
+        def segments():
+            # segments are decoded lazily while iterating
+            for i, segment in enumerate(segments_iter):
+                yield {'id': i, 'start': segment.start, 'end': segment.end, 'text': segment.text}
+                if window_hook is not None:
+                    window_hook(min(segment.end, total), total)
+        return segments(), info
+
+    def transcribe(self, waveform, language, window_hook=None):
+        segments, info = self._segments(waveform, language, window_hook)
+        segments = list(segments)
+        return {'text': ''.join(segment['text'] for segment in segments),
+                'segments': segments,
+                'language': info.language}
+
+    def stream(self, waveform, language, window_hook=None, window_seconds=None):
+        # faster-whisper decodes lazily: no windows needed, same transcript as transcribe()
+        segments, _ = self._segments(waveform, language, window_hook)
+        yield from segments
+
+
+ASR_ENGINES = {
+    'whisper': WhisperEngine,
+    'whisper-batched': BatchedWhisperEngine,
+    'faster-whisper': FasterWhisperEngine,
+}
+
+
+def create_asr_engine(name, **kwargs):
+    if name not in ASR_ENGINES:
+        raise ValueError(f"Unknown ASR engine: {name}. Available: {', '.join(ASR_ENGINES)}")
+    return ASR_ENGINES[name](**kwargs)
@@ -0,0 +1,85 @@
+import logging
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import mediainfo
+
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(audio_file, sample_rate=SAMPLE_RATE):
+    # Decodes the file once into a mono float32 buffer in [-1, 1] that both
+    # Whisper and pyannote accept directly, without temp files
+    try:
+        audio = AudioSegment.from_file(audio_file)
+        audio = audio.set_frame_rate(sample_rate).set_channels(1)
+        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+        return samples / float(1 << (8 * audio.sample_width - 1))
+    except Exception as e:
+        logging.error(f"Audio loading failed: {e}")
+        raise
+
+
+def load_audio_mmap(audio_file, sample_rate=SAMPLE_RATE, directory=None):
+    # Same buffer as load_audio, but ffmpeg decodes it straight into a temp
+    # file that is memory-mapped: multi-hour recordings never have to fit in
+    # RAM, only the pages being read are resident. The file is unlinked right
+    # away and disappears with the last reference to the array.
+    fd, path = tempfile.mkstemp(suffix='.f32', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            subprocess.run([AudioSegment.converter, '-nostdin', '-loglevel', 'error', '-i', str(audio_file),
+                            '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), '-'],
+                           stdout=output, stderr=subprocess.PIPE, check=True)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.float32)
+        # copy-on-write: consumers that expect a writable array (torch) get one
+        return np.memmap(path, dtype=np.float32, mode='c')
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Audio loading failed: {e.stderr.decode(errors='replace').strip()}")
+        raise
+    finally:
+        os.remove(path)
+
+
+def empty_mmap(length, dtype=np.float32, directory=None):
+    # Zero-filled writable buffer in an unlinked temp file, for buffers made
+    # from a load_audio_mmap one that should stay out of RAM as well
+    if length == 0:
+        return np.zeros(0, dtype=dtype)
+    fd, path = tempfile.mkstemp(suffix='.f32', dir=directory)
+    try:
+        os.ftruncate(fd, length * np.dtype(dtype).itemsize)
+        return np.memmap(path, dtype=dtype, mode='r+', shape=(length, ))
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def audio_duration(waveform, sample_rate=SAMPLE_RATE):
+    return len(waveform) / sample_rate
+
+
+def probe_duration(audio_file):
+    # Reads the duration from the container header (ffprobe) without decoding
+    try:
+        return float(mediainfo(audio_file)['duration'])
+    except Exception as e:
+        logging.warning(f"Could not probe duration of {audio_file}: {e}")
+        return None
+
+
+def sniff_format(header):
+    # Detects the container from the first bytes of the upload, so a file is
+    # accepted for what it is rather than for its extension
+    if len(header) >= 12 and header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if len(header) >= 12 and header[4:8] == b'ftyp':
+        return 'm4a'
+    if header[:3] == b'ID3' or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+import whisper
+from whisper.audio import CHUNK_LENGTH, N_FRAMES, HOP_LENGTH, SAMPLE_RATE as WHISPER_SAMPLE_RATE
+from whisper.tokenizer import get_tokenizer
+
+
+TIME_PRECISION = 2 * HOP_LENGTH / WHISPER_SAMPLE_RATE  # 0.02 s per timestamp token
+
+
+class _Request:
+    def __init__(self, windows, language):
+        self.windows = windows
+        self.language = language
+        self.results = [None] * len(windows)
+        self.remaining = len(windows)
+        self.cancelled = False
+        self.future = Future()
+        self.progress = threading.Condition()
+
+
+class BatchedWhisperService:
+    # Decodes 30-second windows from any number of concurrent transcriptions in
+    # shared padded batches: a batch is sent to the encoder/decoder once it has
+    # max_batch_size windows, or max_wait_ms after its first window arrived.
+    #
+    # Unlike whisper's transcribe(), windows are fixed 30-second slices decoded
+    # independently (no conditioning on the previous window, no temperature
+    # fallback) - that is what makes them batchable across jobs.
+    def __init__(self, model, max_batch_size=8, max_wait_ms=50):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='whisper-batcher', daemon=True)
+        self._worker.start()
+
+    def _windows(self, waveform):
+        mel = whisper.log_mel_spectrogram(torch.from_numpy(waveform), self.model.dims.n_mels)
+        n_windows = max(1, -(-mel.shape[-1] // N_FRAMES))
+        return [whisper.pad_or_trim(mel[:, i * N_FRAMES:(i + 1) * N_FRAMES], N_FRAMES)
+                for i in range(n_windows)]
+
+    def transcribe(self, waveform, language, window_hook=None):
+        request = _Request(self._windows(waveform), language)
+        for index in range(len(request.windows)):
+            self._queue.put((request, index))
+
+        total = len(waveform) / WHISPER_SAMPLE_RATE
+        try:
+            while True:
+                with request.progress:
+                    request.progress.wait(timeout=0.5)
+                    done = len(request.windows) - request.remaining
+                if window_hook is not None:
+                    window_hook(min(done * CHUNK_LENGTH, total), total)
+                if request.future.done():
+                    break
+        except BaseException:
+            # the caller gave up (e.g. cancelled): drop its pending windows
+            request.cancelled = True
+            raise
+        return request.future.result()
+
+    def close(self):
+        self._queue.put(None)
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # closing: finish this batch first
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return [(request, index) for request, index in batch if not request.cancelled]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            by_language = {}
+            for request, index in batch:
+                by_language.setdefault(request.language, []).append((request, index))
+            for language, items in by_language.items():
+                try:
+                    self._decode(language, items)
+                except Exception as e:
+                    logging.error(f"Batched recognition failed: {e}")
+                    for request, _ in items:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+
+    def _decode(self, language, items):
+        mel = torch.stack([request.windows[index] for request, index in items]).to(self.model.device)
+        options = whisper.DecodingOptions(task='transcribe', language=language, without_timestamps=False,
+                                          fp16=self.model.device.type == 'cuda')
+        results = whisper.decode(self.model, mel, options)
+
+        tokenizer = get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                  language=language, task='transcribe')
+        for (request, index), result in zip(items, results):
+            # same silence rule as whisper.transcribe
+            if result.no_speech_prob > 0.6 and result.avg_logprob < -1:
+                segments = []
+            else:
+                segments = _segments_from_tokens(result.tokens, tokenizer, index * CHUNK_LENGTH)
+            with request.progress:
+                request.results[index] = segments
+                request.remaining -= 1
+                finished = request.remaining == 0
+                request.progress.notify_all()
+            if finished and not request.future.done():
+                request.future.set_result(_assemble(request.results))
+
+
+def _segments_from_tokens(tokens, tokenizer, offset):
+    segments = []
+    start, text_tokens = 0.0, []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                segments.append({'start': offset + start, 'end': offset + t,
+                                 'text': tokenizer.decode(text_tokens)})
+                text_tokens = []
+            start = t
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    if text_tokens:
+        segments.append({'start': offset + start, 'end': offset + CHUNK_LENGTH,
+                         'text': tokenizer.decode(text_tokens)})
+    return segments
+
+
+def _assemble(window_segments):
+    segments = []
+    for window in window_segments:
+        for segment in window:
+            segments.append({'id': len(segments), **segment})
+    return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
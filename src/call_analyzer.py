@@ -0,0 +1,98 @@
+import logging
+import re
+
+from chunking import chunk_transcript, map_parallel
+from actions_extractor import ExtractedActions, deduplicate_actions
+
+
+SUMMARY_MARKER = '=== РЕЗЮМЕ ==='
+ACTIONS_MARKER = '=== ЗАДАЧИ ==='
+
+
+class CallAnalysis:
+    def __init__(self, summary, actions):
+        self.summary = summary
+        self.actions = actions
+
+
+class CallAnalyzer:
+    # Summary and action items from one LLM request instead of two, so the
+    # transcript is only sent (and prompt-processed) once. The response has
+    # a Markdown part and an ExtractedActions JSON part under fixed markers;
+    # JSON-escaped Markdown is too fragile for local models, plain sections
+    # are not. Long transcripts are analyzed chunk by chunk, then the chunk
+    # notes are reduced with the summarizer's reduce prompt.
+    #
+    # analyze() raises when the response can't be parsed; callers fall back
+    # to summarizer.full_summarize + actions_extractor.extract.
+    def __init__(self, summarizer, actions_extractor):
+        self.summarizer = summarizer
+        self.actions_extractor = actions_extractor
+
+        self.template = """
+        Ты интеллектуальный ассистент для анализа деловых созвонов.
+
+        Проанализируй текст созвона и дай ответ из двух частей.
+
+        Первая часть начинается строкой {summary_marker}. В ней резюме по шаблону,
+        красиво в формате Markdown, на русском языке, соблюдая порядок заголовков:
+        - Цель
+        - Ключевые моменты
+        - Действия и задачи
+        - Резюме (2-3 предложения)
+
+        Вторая часть начинается строкой {actions_marker}. В ней только JSON с задачами
+        из созвона (название, срок, ответственный, детали) строго в этом формате:
+        {format_instructions}
+
+        Текст созвона:
+        {text}
+        """
+
+        self.chunk_template = """
+        Ты интеллектуальный ассистент для анализа деловых созвонов.
+
+        Ниже фрагмент {index} из {total} длинного созвона. Дай ответ из двух частей.
+
+        Первая часть начинается строкой {summary_marker}. В ней кратко, на русском языке,
+        без вступлений: о чём говорили, ключевые моменты и решения, упомянутые задачи.
+
+        Вторая часть начинается строкой {actions_marker}. В ней только JSON с задачами
+        из этого фрагмента строго в этом формате:
+        {format_instructions}
+
+        Фрагмент:
+        {text}
+        """
+
+    def _prompt(self, template, text, **kwargs):
+        return template.format(text=text, summary_marker=SUMMARY_MARKER, actions_marker=ACTIONS_MARKER,
+                               format_instructions=self.actions_extractor.parser.get_format_instructions(),
+                               **kwargs)
+
+    def parse(self, output):
+        match = re.search(rf'{re.escape(SUMMARY_MARKER)}(.*?){re.escape(ACTIONS_MARKER)}(.*)', output, re.S)
+        if match is None:
+            raise ValueError("Combined response has no summary/actions sections")
+        summary = match.group(1).strip()
+        if not summary:
+            raise ValueError("Combined response has an empty summary")
+        return CallAnalysis(summary, self.actions_extractor.parser.parse(match.group(2)))
+
+    def _analyze_one(self, prompt):
+        return self.parse(self.summarizer._invoke(prompt))
+
+    def analyze(self, text, turns=None):
+        if not text or len(text.strip()) < 10:
+            raise ValueError("Text is too short for analysis")
+        if not self.summarizer._needs_chunking(text):
+            return self._analyze_one(self._prompt(self.template, text))
+
+        chunks = chunk_transcript(text, self.summarizer.chunk_tokens, turns)
+        prompts = [self._prompt(self.chunk_template, chunk, index=i + 1, total=len(chunks))
+                   for i, chunk in enumerate(chunks)]
+        partials = map_parallel(self._analyze_one, prompts, self.summarizer.max_parallel)
+        logging.info(f"Combined analysis of {len(chunks)} chunks")
+        summary = self.summarizer._reduce([partial.summary for partial in partials])
+        actions = deduplicate_actions([action for partial in partials for action in partial.actions.actions])
+        return CallAnalysis(summary, ExtractedActions(actions=actions))
@@ -0,0 +1,105 @@
+import re
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Rough budget for Russian text on llama3 / gpt-oss tokenizers; the local
+# backends don't expose a tokenizer, and an estimate is enough to stay
+# under the context window with some headroom
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_sentences(text):
+    return [s for s in re.split(r'(?<=[.!?…])\s+', text.strip()) if s]
+
+
+def iter_chunks(turns, max_tokens):
+    # Greedily packs consecutive turns into chunks of at most max_tokens.
+    # A chunk never ends inside a turn unless that single turn is over budget,
+    # in which case it is split on sentence boundaries. Chunks are yielded as
+    # soon as they are complete, so turns may come from a live transcript.
+    current, current_tokens = [], 0
+    for turn in turns:
+        turn = turn.strip()
+        if not turn:
+            continue
+        tokens = estimate_tokens(turn)
+        if tokens > max_tokens:
+            pieces = split_sentences(turn)
+            if len(pieces) > 1:
+                chunks_of_turn = chunk_turns(pieces, max_tokens)
+            else:
+                # estimate_tokens counts one more than the characters / 3
+                step = max(1, max_tokens - 1) * CHARS_PER_TOKEN
+                chunks_of_turn = [turn[i:i + step] for i in range(0, len(turn), step)]
+            if current:
+                yield ' '.join(current)
+                current, current_tokens = [], 0
+            yield from chunks_of_turn
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            yield ' '.join(current)
+            current, current_tokens = [], 0
+        current.append(turn)
+        current_tokens += tokens
+    if current:
+        yield ' '.join(current)
+
+
+def chunk_turns(turns, max_tokens):
+    return list(iter_chunks(turns, max_tokens))
+
+
+def content_defined_chunks(text, max_tokens, cut_every=16):
+    # Chunks whose boundaries depend only on the sentences around them, not
+    # on everything before: after min_tokens a chunk ends at a sentence whose
+    # hash is 0 mod cut_every. An edit then changes the chunk it falls into
+    # (and rarely the next one), while greedy packing would shift every later
+    # boundary. Whitespace is normalized, so the same words give the same
+    # chunks whether they come from Whisper's text or the joined dialogue.
+    min_tokens = max_tokens // 2
+    chunks, current, current_tokens = [], [], 0
+    for sentence in split_sentences(text):
+        sentence = ' '.join(sentence.split())
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            if current:
+                chunks.append(' '.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(chunk_turns([sentence], max_tokens))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+        digest = int.from_bytes(hashlib.md5(sentence.encode('utf-8')).digest()[:4], 'big')
+        if current_tokens >= min_tokens and digest % cut_every == 0:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def chunk_transcript(text, max_tokens, turns=None):
+    # turns: speaker turns (or Whisper segments) of the same text; without
+    # them the transcript is split on sentence boundaries
+    if not turns:
+        turns = split_sentences(text)
+    return chunk_turns(turns, max_tokens)
+
+
+def map_parallel(fn, items, max_parallel=1):
+    if max_parallel <= 1 or len(items) < 2:
+        return [fn(item) for item in items]
+    # each call runs in a copy of the caller's context (profiling looks up
+    # the current job and stage there)
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(items)), thread_name_prefix='llm') as executor:
+        return list(executor.map(lambda context, item: context.run(fn, item), contexts, items))
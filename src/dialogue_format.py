@@ -0,0 +1,56 @@
+from bisect import bisect_left, bisect_right
+
+
+# Dialogue payloads for the API. A dialogue is a list of
+# {'speaker', 'start', 'end', 'text'} rows; the columnar form stores each
+# field once as a parallel array and the speakers once in a table:
+#   {'speakers': ['SPEAKER_00', ...], 'speaker': [0, 1, 0, ...],
+#    'start': [...], 'end': [...], 'text': [...]}
+# which saves the repeated keys and speaker names of every row.
+
+DIALOGUE_FORMATS = ('rows', 'columnar', 'none')
+
+
+def to_columnar(dialogue):
+    speakers, index = [], {}
+    columns = {'speaker': [], 'start': [], 'end': [], 'text': []}
+    for segment in dialogue:
+        speaker = segment['speaker']
+        if speaker not in index:
+            index[speaker] = len(speakers)
+            speakers.append(speaker)
+        columns['speaker'].append(index[speaker])
+        # millisecond precision is all the UI and the Markdown export show
+        columns['start'].append(round(segment['start'], 3))
+        columns['end'].append(round(segment['end'], 3))
+        columns['text'].append(segment['text'])
+    return {'speakers': speakers, **columns}
+
+
+def from_columnar(columnar):
+    return [{'speaker': columnar['speakers'][speaker], 'start': start, 'end': end, 'text': text}
+            for speaker, start, end, text in zip(columnar['speaker'], columnar['start'],
+                                                 columnar['end'], columnar['text'])]
+
+
+def select_dialogue(dialogue, offset=0, limit=None, start=None, end=None):
+    # Rows [offset, offset + limit) of the segments overlapping [start, end]
+    # (seconds); returns (rows, total matching). Segments are in time order,
+    # so the range is found by bisection.
+    first, last = 0, len(dialogue)
+    if end is not None:
+        last = bisect_left([segment['start'] for segment in dialogue], end)
+    if start is not None:
+        first = min(last, bisect_right([segment['end'] for segment in dialogue], start))
+    total = last - first
+    first += offset
+    stop = last if limit is None else min(last, first + limit)
+    return dialogue[first:stop], total
+
+
+def format_dialogue(dialogue, dialogue_format='rows'):
+    if dialogue_format == 'columnar':
+        return to_columnar(dialogue)
+    if dialogue_format == 'none':
+        return None
+    return dialogue
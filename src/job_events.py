@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+
+class JobEvents:
+    # In-process fan-out of job progress events from worker threads to the
+    # asyncio handlers streaming them to clients
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id):
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(job_id, []) if s[1] is not queue]
+            if subscribers:
+                self._subscribers[job_id] = subscribers
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # the subscriber's loop is already closed
+                pass
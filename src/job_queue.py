@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobScheduler:
+    # Bounded priority queue in front of a fixed pool of worker threads.
+    # Jobs are ordered by `priority` (lower first, e.g. audio duration when
+    # short files should go first) and then by submission order.
+    def __init__(self, handler, num_workers=1, max_queue_size=16, prioritize_short=False):
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.prioritize_short = prioritize_short
+
+        self._heap = []
+        self._queued = {}
+        self._running = set()
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._workers = []
+
+    def start(self):
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def submit(self, job_id, *args, duration=None, **kwargs):
+        priority = 0
+        if self.prioritize_short:
+            priority = duration if duration is not None else float('inf')
+        future = Future()
+        with self._cond:
+            if len(self._queued) >= self.max_queue_size:
+                raise JobQueueFull(f"Queue is full ({self.max_queue_size} jobs)")
+            entry = (priority, next(self._counter), job_id)
+            self._queued[job_id] = (entry, args, kwargs, future)
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+        return future
+
+    def full(self):
+        # Admission check before a job's input is received; submit() still
+        # raises JobQueueFull if the queue has filled up in the meantime
+        with self._cond:
+            return len(self._queued) >= self.max_queue_size
+
+    def cancel(self, job_id):
+        # Only jobs that are still waiting can be dropped here; running jobs
+        # have to be stopped by the handler itself
+        with self._cond:
+            queued = self._queued.pop(job_id, None)
+        if queued is None:
+            return False
+        queued[3].cancel()
+        return True
+
+    def position(self, job_id):
+        # 1-based place in the queue, 0 while running, None if unknown
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            if job_id not in self._queued:
+                return None
+            entry = self._queued[job_id][0]
+            return 1 + sum(1 for other, *_ in self._queued.values() if other < entry)
+
+    def stats(self):
+        with self._cond:
+            return {'queued': len(self._queued), 'running': len(self._running),
+                    'workers': self.num_workers, 'max_queue_size': self.max_queue_size}
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                while self._heap:
+                    entry = heapq.heappop(self._heap)
+                    job_id = entry[2]
+                    queued = self._queued.get(job_id)
+                    # skip heap entries of cancelled jobs
+                    if queued is not None and queued[0] == entry:
+                        del self._queued[job_id]
+                        self._running.add(job_id)
+                        return (job_id, ) + queued[1:]
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            job_id, args, kwargs, future = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(self.handler(job_id, *args, **kwargs))
+            except Exception as e:
+                logging.error(f"Job {job_id} failed: {e}")
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running.discard(job_id)
@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+FINISHED_STATUSES = ('completed', 'error', 'cancelled')
+STATUS_FIELDS = ('status', 'step', 'progress', 'message', 'error', 'file_path', 'timings')
+# stored as JSON text by SQLiteJobStore
+JSON_FIELDS = ('timings', )
+_MISSING = object()
+
+
+class BaseJobStore(ABC):
+    # Job status, job result and the partial dialogue of a running job are
+    # stored apart: status polls read a few scalar fields and never touch the
+    # (possibly large) result or partial transcript.
+    # Finished jobs expire after ttl_seconds, and at most max_finished of them
+    # are kept.
+    def __init__(self, ttl_seconds=3600, max_finished=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+
+    @abstractmethod
+    def update(self, job_id, **fields):
+        # Creates the job if needed; a `result` field goes to the result
+        # storage, `partial_dialogue` to its own (None removes it)
+        pass
+
+    @abstractmethod
+    def get_status(self, job_id):
+        pass
+
+    @abstractmethod
+    def get_result(self, job_id):
+        pass
+
+    @abstractmethod
+    def get_partial(self, job_id):
+        pass
+
+    @abstractmethod
+    def delete(self, job_id):
+        pass
+
+    @abstractmethod
+    def evict(self):
+        pass
+
+    def create(self, job_id, **fields):
+        self.evict()
+        defaults = {'status': 'pending', 'step': None, 'progress': 0, 'message': None, 'error': None}
+        self.update(job_id, **{**defaults, **fields})
+
+
+class MemoryJobStore(BaseJobStore):
+    def __init__(self, ttl_seconds=3600, max_finished=1000):
+        super().__init__(ttl_seconds, max_finished)
+        self._jobs = {}
+        self._results = {}
+        self._partials = {}
+        self._lock = threading.Lock()
+
+    def update(self, job_id, **fields):
+        now = time.time()
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'created_at': now, 'finished_at': None})
+            if 'result' in fields:
+                self._results[job_id] = fields.pop('result')
+            if 'partial_dialogue' in fields:
+                partial = fields.pop('partial_dialogue')
+                if partial is None:
+                    self._partials.pop(job_id, None)
+                else:
+                    self._partials[job_id] = partial
+            job.update(fields)
+            job['updated_at'] = now
+            if job.get('status') in FINISHED_STATUSES and job['finished_at'] is None:
+                job['finished_at'] = now
+
+    def get_status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def get_result(self, job_id):
+        with self._lock:
+            return self._results.get(job_id)
+
+    def get_partial(self, job_id):
+        with self._lock:
+            return self._partials.get(job_id)
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+            self._partials.pop(job_id, None)
+
+    def evict(self):
+        now = time.time()
+        with self._lock:
+            finished = sorted((job['finished_at'], job_id) for job_id, job in self._jobs.items()
+                              if job['finished_at'] is not None)
+            expired = [job_id for finished_at, job_id in finished if now - finished_at > self.ttl_seconds]
+            overflow = len(finished) - len(expired) - self.max_finished
+            if overflow > 0:
+                expired += [job_id for _, job_id in finished[len(expired):len(expired) + overflow]]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._results.pop(job_id, None)
+                self._partials.pop(job_id, None)
+
+
+class SQLiteJobStore(BaseJobStore):
+    # Shared between uvicorn worker processes: WAL lets status reads run
+    # alongside the writes of whichever process owns the job
+    def __init__(self, path='data/jobs.db', ttl_seconds=3600, max_finished=1000):
+        super().__init__(ttl_seconds, max_finished)
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT, step TEXT, progress REAL, message TEXT, error TEXT, file_path TEXT,
+                    timings TEXT, created_at REAL, updated_at REAL, finished_at REAL
+                )''')
+            # databases created before a column was added
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for name in STATUS_FIELDS:
+                if name not in existing:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT PRIMARY KEY REFERENCES jobs (id) ON DELETE CASCADE,
+                    result TEXT
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_partials (
+                    job_id TEXT PRIMARY KEY REFERENCES jobs (id) ON DELETE CASCADE,
+                    dialogue TEXT
+                )''')
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def update(self, job_id, **fields):
+        now = time.time()
+        result = fields.pop('result', _MISSING)
+        partial = fields.pop('partial_dialogue', _MISSING)
+        columns = [name for name in STATUS_FIELDS if name in fields]
+        finished = fields.get('status') in FINISHED_STATUSES
+
+        assignments = ', '.join([f'{name} = excluded.{name}' for name in columns] + ['updated_at = excluded.updated_at'])
+        if finished:
+            assignments += ', finished_at = COALESCE(jobs.finished_at, excluded.finished_at)'
+        sql = (f"INSERT INTO jobs (id, {', '.join(columns + ['created_at', 'updated_at', 'finished_at'])}) "
+               f"VALUES ({', '.join(['?'] * (len(columns) + 4))}) "
+               f"ON CONFLICT(id) DO UPDATE SET {assignments}")
+        values = [json.dumps(fields[name], ensure_ascii=False) if name in JSON_FIELDS and fields[name] is not None
+                  else fields[name] for name in columns]
+        params = [job_id] + values + [now, now, now if finished else None]
+
+        with self._connect() as conn:
+            conn.execute(sql, params)
+            if result is not _MISSING:
+                conn.execute('INSERT OR REPLACE INTO job_results (job_id, result) VALUES (?, ?)',
+                             (job_id, json.dumps(result, ensure_ascii=False)))
+            if partial is None:
+                conn.execute('DELETE FROM job_partials WHERE job_id = ?', (job_id, ))
+            elif partial is not _MISSING:
+                conn.execute('INSERT OR REPLACE INTO job_partials (job_id, dialogue) VALUES (?, ?)',
+                             (job_id, json.dumps(partial, ensure_ascii=False)))
+
+    def get_status(self, job_id):
+        # only the status columns (older databases may still have others)
+        columns = ', '.join(('id', ) + STATUS_FIELDS + ('created_at', 'updated_at', 'finished_at'))
+        row = self._connect().execute(f'SELECT {columns} FROM jobs WHERE id = ?', (job_id, )).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in JSON_FIELDS:
+            if job.get(name) is not None:
+                job[name] = json.loads(job[name])
+        return job
+
+    def get_result(self, job_id):
+        row = self._connect().execute('SELECT result FROM job_results WHERE job_id = ?', (job_id, )).fetchone()
+        return json.loads(row['result']) if row is not None else None
+
+    def get_partial(self, job_id):
+        row = self._connect().execute('SELECT dialogue FROM job_partials WHERE job_id = ?', (job_id, )).fetchone()
+        return json.loads(row['dialogue']) if row is not None else None
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id, ))
+
+    def evict(self):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                         (now - self.ttl_seconds, ))
+            conn.execute('''
+                DELETE FROM jobs WHERE id IN (
+                    SELECT id FROM jobs WHERE finished_at IS NOT NULL
+                    ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+                )''', (self.max_finished, ))
+
+
+def create_job_store(kind='memory', **kwargs):
+    if kind == 'memory':
+        kwargs.pop('path', None)
+        return MemoryJobStore(**kwargs)
+    if kind == 'sqlite':
+        return SQLiteJobStore(**kwargs)
+    raise ValueError(f"Unknown job store: {kind}")
@@ -0,0 +1,205 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from profiling import llm_usage_callback
+
+
+# All LLM requests go through one asyncio loop in a background thread:
+#  - one langchain model (and so one pooled httpx client) per backend, model,
+#    base_url and temperature, shared by the summarizer, the extractor and
+#    the combined analyzer; requests use ainvoke, so parallel chunk prompts
+#    don't each hold a thread on a blocking socket
+#  - responses are cached by backend, model, temperature and prompt hash
+#    (LRU with TTL), so re-summarizing the same transcript is free
+#  - identical prompts already in flight share one generation
+# Callers (pipeline and threadpool threads) block in invoke() while the
+# request runs on the loop.
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(backend, model_name, temperature, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{backend}:{model_name}:{temperature}:{digest}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl_seconds or time.monotonic() - entry[0] < self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+response_cache = ResponseCache(max_entries=int(os.getenv('LLM_CACHE_SIZE', '256')),
+                               ttl_seconds=int(os.getenv('LLM_CACHE_TTL_SECONDS', '3600')))
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='llm-client-loop', daemon=True).start()
+        return _loop
+
+
+def _reset_after_fork():
+    # The loop thread doesn't survive fork (see process_pool); workers start
+    # their own on first use
+    global _loop, _loop_lock
+    _loop = None
+    _loop_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class LLMClient:
+    def __init__(self, backend, model_name, base_url=None, api_key=None, temperature=0.2,
+                 max_concurrency=None, cache=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+        self.cache = cache if cache is not None else response_cache
+        # Per loop state: after a fork the model's async http client, the
+        # in-flight map and the semaphore belong to a loop that is gone
+        self._state_loop = None
+        self._model = None
+        self._inflight = {}
+        self._semaphore = None
+
+    def _build(self):
+        if self.backend == 'ollama':
+            from langchain_ollama.llms import OllamaLLM
+            return OllamaLLM(model=self.model_name, temperature=self.temperature,
+                             callbacks=[llm_usage_callback()])
+        if self.backend == 'openai':
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(model=self.model_name, base_url=self.base_url, api_key=self.api_key,
+                              temperature=self.temperature, callbacks=[llm_usage_callback()])
+        raise ValueError(f"Unknown LLM backend: {self.backend}")
+
+    def _ensure_state(self):
+        loop = asyncio.get_running_loop()
+        if self._state_loop is not loop:
+            self._state_loop = loop
+            self._model = self._build()
+            self._inflight = {}
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _generate(self, prompt):
+        async with self._semaphore:
+            response = await self._model.ainvoke(prompt)
+        return response if isinstance(response, str) else response.content
+
+    async def _cached(self, prompt):
+        # Runs on the background loop, so the in-flight map needs no lock
+        self._ensure_state()
+        key = self.cache.key(self.backend, self.model_name, self.temperature, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        try:
+            result = await self._generate(prompt)
+        except BaseException as e:
+            pending.set_exception(e)
+            # retrieved here so that a failure nobody else waited on isn't logged
+            pending.exception()
+            raise
+        else:
+            self.cache.put(key, result)
+            pending.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def _submit(self, prompt):
+        # The task runs in a copy of the caller's context, so the usage
+        # callback charges the request to the caller's job and stage
+        loop = _background_loop()
+        future = concurrent.futures.Future()
+        context = contextvars.copy_context()
+
+        def start():
+            task = loop.create_task(self._cached(prompt), context=context)
+            task.add_done_callback(lambda done: _copy_result(done, future))
+
+        loop.call_soon_threadsafe(start)
+        return future
+
+    def invoke(self, prompt):
+        return self._submit(prompt).result()
+
+
+def _copy_result(task, future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(backend, model_name, base_url=None, api_key=None, temperature=0.2):
+    # Shared client per backend/model/endpoint/temperature
+    key = (backend, model_name, base_url, api_key, temperature)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = LLMClient(backend, model_name, base_url=base_url, api_key=api_key,
+                                               temperature=temperature)
+            logging.info(f"LLM client: {backend} {model_name}")
+        return client
@@ -1,11 +1,21 @@
 import logging
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
-from langchain_ollama.llms import OllamaLLM
-from langchain_openai import ChatOpenAI
+
+from chunking import chunk_transcript, chunk_turns, content_defined_chunks, estimate_tokens, iter_chunks, map_parallel
+from llm_client import get_client
 
 
 class BaseSummarizer(ABC):
-    def __init__(self):
+    def __init__(self, chunk_tokens=None, max_parallel=1):
+        # Transcripts over chunk_tokens are summarized hierarchically: chunks in
+        # parallel (up to max_parallel requests), then one reduce prompt
+        self.chunk_tokens = chunk_tokens
+        self.max_parallel = max_parallel
+
         self.summary_prompt = """
         Ты интеллектуальный ассистент для анализа деловых созвонов.
         
@@ -26,6 +36,41 @@ class BaseSummarizer(ABC):
         {text}
         """
 
+        self.chunk_prompt = """
+        Ты интеллектуальный ассистент для анализа деловых созвонов.
+
+        Ниже фрагмент {index} длинного созвона. Кратко перечисли:
+        - О чём говорили в этом фрагменте
+        - Ключевые моменты и принятые решения
+        - Упомянутые действия и задачи, ответственных и сроки
+
+        Пиши только по тексту фрагмента, на русском языке, без вступлений.
+
+        Фрагмент:
+        {text}
+        """
+
+        self.reduce_prompt = """
+        Ты интеллектуальный ассистент для анализа деловых созвонов.
+
+        Ниже краткие конспекты последовательных фрагментов одного созвона.
+        Объедини их и создай резюме всего созвона по следующему шаблону:
+        - Основная цель созвона
+        - Ключевые моменты
+        - Действия и задачи
+
+        Далее напиши краткое резюме (2-3 предложения).
+
+        Оформь красиво в формате Markdown, на русском языке, соблюдая порядок заголовков:
+        - Цель
+        - Ключевые моменты
+        - Действия и задачи
+        - Резюме
+
+        Конспекты фрагментов:
+        {text}
+        """
+
         self.simple_prompt = """
         Ты интеллектуальный ассистент для анализа деловых созвонов.
 
@@ -37,13 +82,68 @@ class BaseSummarizer(ABC):
     def _invoke(self, prompt):
         pass
 
-    def full_summarize(self, text):
+    def _needs_chunking(self, text):
+        return bool(self.chunk_tokens) and estimate_tokens(text) > self.chunk_tokens
+
+    def _summarize_chunk(self, chunk, index):
+        # the chunk prompt doesn't mention the number of chunks: with
+        # IncrementalSummary it is not known yet when the first ones are sent
+        return self._invoke(self.chunk_prompt.format(index=index, text=chunk))
+
+    def _summarize_chunks(self, chunks, first_index=1):
+        return map_parallel(lambda item: self._summarize_chunk(*item),
+                            [(chunk, first_index + i) for i, chunk in enumerate(chunks)], self.max_parallel)
+
+    def _map_reduce_summarize(self, text, turns=None):
+        partials = self._summarize_chunks(chunk_transcript(text, self.chunk_tokens, turns))
+        return self._reduce(partials)
+
+    def _reduce(self, partials):
+        # Very long calls: the partial summaries themselves may not fit into
+        # one reduce prompt, so they are condensed level by level
+        while len(partials) > 1 and self._needs_chunking('\n\n'.join(partials)):
+            groups = chunk_turns(partials, self.chunk_tokens)
+            if len(groups) >= len(partials):
+                break
+            partials = self._summarize_chunks(groups)
+        return self._invoke(self.reduce_prompt.format(text='\n\n'.join(partials)))
+
+    def cached_summarize(self, text, chunk_cache):
+        # Map-reduce over content-defined chunks whose summaries are kept in
+        # chunk_cache (result_cache.ContentCache): after an edit only the
+        # changed chunks and the reduce go to the LLM. Cached summaries are
+        # reused whatever the chunk's position (the index in the prompt).
+        if not text or len(text.strip()) < 10:
+            return "Text is too short for analysis"
+        if not self._needs_chunking(text):
+            return self._invoke(self.summary_prompt.format(text=text))
+        chunks = content_defined_chunks(text, self.chunk_tokens)
+        partials = [chunk_cache.get(chunk) for chunk in chunks]
+        missing = [i for i, partial in enumerate(partials) if partial is None]
+
+        def summarize(i):
+            partial = self._summarize_chunk(chunks[i], i + 1)
+            chunk_cache.set(chunks[i], partial)
+            return partial
+        for i, partial in zip(missing, map_parallel(summarize, missing, self.max_parallel)):
+            partials[i] = partial
+        logging.info(f"Summary of {len(chunks)} chunks, {len(missing)} not cached")
+        return self._reduce(partials)
+
+    def incremental(self):
+        return IncrementalSummary(self)
+
+    def full_summarize(self, text, raise_errors=False, turns=None):
         try:
             if not text or len(text.strip()) < 10:
                 return "Text is too short for analysis"
+            if self._needs_chunking(text):
+                return self._map_reduce_summarize(text, turns)
             result = self._invoke(self.summary_prompt.format(text=text))
             return result
         except Exception as e:
+            if raise_errors:
+                raise
             logging.error(f"Error during summarization: {e}")
             return f"Error during processing: {e}"
 
@@ -55,26 +155,87 @@ class BaseSummarizer(ABC):
             logging.error(f"Error during simple summarization: {e}")
             return f"Error: {e}"
 
-    
+
+
+class IncrementalSummary:
+    # Map phase of a long summary started while the transcript is still being
+    # recognized: turns are fed with add(), and every chunk is sent to the LLM
+    # as soon as the next turn no longer fits into it. finish() summarizes the
+    # last chunk and reduces; it returns None when the whole text fits into
+    # one chunk, so the caller summarizes it with the single-prompt path.
+    def __init__(self, summarizer):
+        self.summarizer = summarizer
+        self.chunks = []
+        self._futures = []
+        self._turns = queue.Queue()
+        self._closed = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, summarizer.max_parallel),
+                                            thread_name_prefix='llm')
+        # chunk requests run in the creator's context (profiling)
+        self._context = contextvars.copy_context()
+        self._feeder = threading.Thread(target=self._context.copy().run, args=(self._feed, ),
+                                        name='incremental-summary', daemon=True)
+        self._feeder.start()
+
+    def _feed(self):
+        for chunk in iter_chunks(iter(self._turns.get, None), self.summarizer.chunk_tokens):
+            self.chunks.append(chunk)
+            if self._closed.is_set():
+                continue
+            try:
+                self._futures.append(self._executor.submit(self._context.copy().run, self.summarizer._summarize_chunk,
+                                                           chunk, len(self.chunks)))
+            except RuntimeError:
+                # closed in the meantime
+                pass
+
+    def _stop_feeding(self):
+        if not self._closed.is_set():
+            self._closed.set()
+            self._turns.put(None)
+
+    def add(self, turn):
+        self._turns.put(turn)
+
+    def finish(self):
+        self._stop_feeding()
+        self._feeder.join()
+        try:
+            if len(self.chunks) < 2:
+                return None
+            partials = [future.result() for future in self._futures]
+            partials += self.summarizer._summarize_chunks(self.chunks[len(partials):], first_index=len(partials) + 1)
+            logging.info(f"Incremental summary of {len(self.chunks)} chunks, {len(self._futures)} sent early")
+            return self.summarizer._reduce(partials)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def close(self):
+        # Abandons the summary (failed or cancelled job): queued chunk
+        # requests are dropped
+        self._stop_feeding()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 class OllamaSummarizer(BaseSummarizer):
-    def __init__(self, model_name='llama3'):
-        super().__init__()
-        self.model = OllamaLLM(model=model_name, temperature=0.2)
+    def __init__(self, model_name='llama3', chunk_tokens=3000, max_parallel=1):
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = model_name
+        self.client = get_client('ollama', model_name, temperature=0.2)
 
     def _invoke(self, prompt):
-        return self.model.invoke(prompt)
+        return self.client.invoke(prompt)
 
 class OpenAISummarizer(BaseSummarizer):
     def __init__(self, model_name="openai/gpt-oss-20b", 
                  base_url="http://localhost:1234/v1", 
-                 api_key="lm-studio"
+                 api_key="lm-studio",
+                 chunk_tokens=6000,
+                 max_parallel=2
                  ):
-        super().__init__()
-        self.model = ChatOpenAI(
-            model=model_name,
-            base_url = base_url,
-            api_key = api_key,
-            temperature=0.2)
+        super().__init__(chunk_tokens=chunk_tokens, max_parallel=max_parallel)
+        self.model_name = model_name
+        self.client = get_client('openai', model_name, base_url=base_url, api_key=api_key, temperature=0.2)
 
     def _invoke(self, prompt):
-        return self.model.invoke(prompt).content
\ No newline at end of file
+        return self.client.invoke(prompt)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import gc
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ModelRegistry:
+    # Named heavy models loaded on first use. With idle_timeout set, a reaper
+    # thread unloads models that nobody has used for that many seconds;
+    # models held through using() are never unloaded mid-call.
+    def __init__(self, idle_timeout=None):
+        self.idle_timeout = idle_timeout
+        self._loaders = {}
+        self._models = {}
+        self._last_used = {}
+        self._load_seconds = {}
+        self._in_use = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._in_use.setdefault(name, 0)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._locks[name]:
+                model = self._models.get(name)
+                if model is None:
+                    logging.info(f"Loading model '{name}'")
+                    started = time.monotonic()
+                    model = self._loaders[name]()
+                    self._load_seconds[name] = time.monotonic() - started
+                    self._models[name] = model
+        self._last_used[name] = time.monotonic()
+        self._start_reaper()
+        return model
+
+    @contextmanager
+    def using(self, name):
+        with self._lock:
+            self._in_use[name] += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+            self._last_used[name] = time.monotonic()
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+        return self.status()
+
+    def unload(self, name):
+        with self._locks[name]:
+            with self._lock:
+                if self._in_use[name]:
+                    return False
+                model = self._models.pop(name, None)
+            if model is None:
+                return False
+            close = getattr(model, 'close', None)
+            if close is not None:
+                close()
+            del model
+        gc.collect()
+        if 'torch' in sys.modules and sys.modules['torch'].cuda.is_available():
+            sys.modules['torch'].cuda.empty_cache()
+        logging.info(f"Unloaded model '{name}'")
+        return True
+
+    def unload_idle(self):
+        if not self.idle_timeout:
+            return []
+        now = time.monotonic()
+        idle = [name for name in list(self._models)
+                if self._in_use[name] == 0 and now - self._last_used.get(name, now) > self.idle_timeout]
+        return [name for name in idle if self.unload(name)]
+
+    def _start_reaper(self):
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name='model-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        interval = max(1.0, min(30.0, self.idle_timeout / 2))
+        while True:
+            time.sleep(interval)
+            self.unload_idle()
+
+    def status(self):
+        now = time.monotonic()
+        return {name: {'loaded': name in self._models,
+                       'in_use': self._in_use[name],
+                       'idle_seconds': round(now - self._last_used[name], 1) if name in self._last_used else None,
+                       'load_seconds': round(self._load_seconds[name], 2) if name in self._load_seconds else None}
+                for name in self._loaders}
@@ -0,0 +1,266 @@
+import atexit
+import collections
+import gc
+import itertools
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import queue
+import signal
+import threading
+
+from summary_pipeline import PipelineCancelled
+
+
+def _worker_main(pipeline, index, tasks, results, control, num_threads):
+    # tasks, results and control are this worker's own pipes: a worker killed
+    # while reading or writing can then only break its own channel, never the
+    # others' (a shared multiprocessing.Queue would keep its lock held)
+    # Runs in a forked child: the pipeline (and the models the parent loaded)
+    # are inherited copy-on-write, only job arguments and results are pickled
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import torch
+    torch.set_num_threads(num_threads)
+    # per-stage budgets must stay within this worker's share of the cores
+    stage_threads = max(1, num_threads // 2) if pipeline.concurrent else num_threads
+    pipeline.asr_threads = pipeline.diarization_threads = stage_threads
+
+    cancelled = set()
+    # in concurrent mode the ASR and diarization threads both poll
+    control_lock = threading.Lock()
+
+    def is_cancelled(job_id):
+        with control_lock:
+            while control.poll():
+                cancelled.add(control.recv())
+            return job_id in cancelled
+
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            # the parent is gone
+            return
+        if task is None:
+            return
+        job_id, audio_file, kwargs = task
+        try:
+            if is_cancelled(job_id):
+                raise PipelineCancelled("Cancelled by user")
+            result = pipeline.run(
+                audio_file,
+                progress_cb=lambda **event: results.send(('progress', job_id, event)),
+                cancel_check=lambda: is_cancelled(job_id),
+                **kwargs,
+            )
+            results.send(('done', job_id, result))
+        except PipelineCancelled as e:
+            results.send(('cancelled', job_id, str(e)))
+        except Exception as e:
+            logging.error(f"Job {job_id} failed in worker {index}: {e}")
+            results.send(('error', job_id, str(e)))
+        finally:
+            cancelled.clear()
+
+
+class _Job:
+    def __init__(self, task):
+        self.task = task
+        self.events = queue.Queue()
+        # index of the worker the task was sent to, None while it waits
+        self.worker = None
+
+
+class PipelineProcessPool:
+    # Runs SummaryPipeline.run in forked worker processes. Models are loaded
+    # once in the parent before forking, so the workers share the weights
+    # copy-on-write and each one runs a full pipeline without the GIL of the
+    # others. run() has the same signature as SummaryPipeline.run and blocks
+    # the calling thread (a JobScheduler worker) until a process has finished.
+    #
+    # Needs the 'fork' start method (Linux) and a CPU-only torch: CUDA cannot
+    # be used from forked children. The whisper-batched engine forms its
+    # batches inside one process and is not supported here.
+    def __init__(self, pipeline, num_workers=2, threads_per_worker=None):
+        if pipeline.speech_recognizer.engine_name == 'whisper-batched':
+            raise ValueError("ASR engine 'whisper-batched' cannot be used with worker processes")
+        self.pipeline = pipeline
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+
+        self._context = multiprocessing.get_context('fork')
+        # jobs are handed out by the parent, one at a time to idle workers
+        self._pending = collections.deque()
+        self._idle = set()
+        self._workers = [None] * num_workers
+        self._tasks = [None] * num_workers
+        self._results = [None] * num_workers
+        self._controls = [None] * num_workers
+        self._jobs = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._stopped = False
+
+    def start(self):
+        # fork before the API starts its own threads, and with the models
+        # already in memory so that children do not load their own copies
+        self.pipeline.models.warm_up()
+        # objects that survive until fork are never touched by the collector
+        # again, which keeps their pages shared
+        gc.collect()
+        gc.freeze()
+        for index in range(self.num_workers):
+            self._spawn(index)
+        # runs before multiprocessing terminates the daemon workers at exit,
+        # so that the listener does not restart them
+        atexit.register(self.shutdown)
+        self._listener = threading.Thread(target=self._listen, name='process-pool-listener', daemon=True)
+        self._listener.start()
+        logging.info(f"Started {self.num_workers} pipeline processes, {self.threads_per_worker} threads each")
+
+    def shutdown(self):
+        self._stopped = True
+        for tasks in self._tasks:
+            try:
+                tasks.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def _spawn(self, index):
+        tasks_reader, tasks_writer = self._context.Pipe(duplex=False)
+        results_reader, results_writer = self._context.Pipe(duplex=False)
+        control_reader, control_writer = self._context.Pipe(duplex=False)
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(self.pipeline, index, tasks_reader, results_writer, control_reader, self.threads_per_worker),
+            name=f'pipeline-worker-{index}',
+            daemon=True,
+        )
+        worker.start()
+        tasks_reader.close()
+        results_writer.close()
+        control_reader.close()
+        self._workers[index] = worker
+        self._tasks[index] = tasks_writer
+        self._results[index] = results_reader
+        self._controls[index] = control_writer
+        with self._lock:
+            self._idle.add(index)
+
+    def _dispatch(self):
+        # The worker is recorded when the task is sent, so a worker that dies
+        # at any point after that fails the job (see _check_workers)
+        with self._lock:
+            while self._pending and self._idle:
+                index = self._idle.pop()
+                if not self._workers[index].is_alive():
+                    # died while idle; _check_workers replaces it
+                    continue
+                job = self._pending.popleft()
+                try:
+                    self._tasks[index].send(job.task)
+                except OSError:
+                    # dead worker: the job waits for the next one, the worker
+                    # is replaced by _check_workers
+                    self._pending.appendleft(job)
+                    continue
+                job.worker = index
+
+    def _cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job.worker is None:
+                # not sent to a worker yet
+                self._pending.remove(job)
+                job.events.put(('cancelled', "Cancelled by user"))
+                return
+            control = self._controls[job.worker]
+        try:
+            control.send(job_id)
+        except OSError:
+            # dead worker, replaced by _check_workers
+            pass
+
+    def _listen(self):
+        while not self._stopped:
+            for conn in wait(self._results, timeout=1.0):
+                self._drain(self._results.index(conn))
+            self._check_workers()
+            self._dispatch()
+
+    def _drain(self, index):
+        conn = self._results[index]
+        try:
+            while conn.poll():
+                kind, job_id, payload = conn.recv()
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                    if kind in ('done', 'cancelled', 'error'):
+                        self._idle.add(index)
+                if job is not None:
+                    job.events.put((kind, payload))
+        except (EOFError, OSError):
+            # the worker has exited; handled by _check_workers
+            pass
+
+    def _check_workers(self):
+        # a worker killed mid-job (e.g. by the OOM killer) fails that job and
+        # is replaced; the new process loads models lazily on its first job
+        for index, worker in enumerate(self._workers):
+            if self._stopped or worker.is_alive():
+                continue
+            logging.error(f"Pipeline worker {index} exited with code {worker.exitcode}, restarting")
+            # whatever the worker sent before exiting is still in the pipe
+            self._drain(index)
+            with self._lock:
+                self._idle.discard(index)
+                lost = [job for job in self._jobs.values() if job.worker == index]
+            for job in lost:
+                job.events.put(('error', f"Worker process exited with code {worker.exitcode}"))
+            self._tasks[index].close()
+            self._results[index].close()
+            self._controls[index].close()
+            self._spawn(index)
+
+    def run(self, audio_file, progress_cb=None, *, cancel_check=None, **kwargs):
+        job_id = next(self._job_ids)
+        job = _Job((job_id, audio_file, kwargs))
+        with self._lock:
+            self._jobs[job_id] = job
+            self._pending.append(job)
+        self._dispatch()
+
+        callback_error = None
+        cancel_sent = False
+        try:
+            while True:
+                try:
+                    kind, payload = job.events.get(timeout=0.5)
+                except queue.Empty:
+                    kind, payload = None, None
+
+                if kind == 'progress' and progress_cb is not None and callback_error is None:
+                    try:
+                        progress_cb(**payload)
+                    except Exception as e:
+                        # same as in-process: a failing callback stops the job
+                        callback_error = e
+                elif kind == 'done':
+                    return payload
+                elif kind == 'cancelled':
+                    raise callback_error or PipelineCancelled(payload)
+                elif kind == 'error':
+                    raise callback_error or RuntimeError(payload)
+
+                if not cancel_sent and (callback_error is not None or (cancel_check and cancel_check())):
+                    self._cancel(job_id)
+                    cancel_sent = True
+        finally:
+            with self._lock:
+                self._jobs.pop(job_id, None)
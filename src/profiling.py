@@ -0,0 +1,298 @@
+import contextvars
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# The profile of the job running in the current context. Stage threads and
+# LLM request threads are started with a copy of the context (see
+# chunking.map_parallel and SummaryPipeline._run_stages), so stage() and the
+# LLM callback find the right job even when several jobs run at once.
+_current_profile = contextvars.ContextVar('current_profile', default=None)
+_current_stage = contextvars.ContextVar('current_stage', default=None)
+
+
+def current_rss():
+    # Resident set size in bytes; falls back to the process high-water mark
+    # where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _new_record():
+    return {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_bytes': 0,
+            'llm_requests': 0, 'llm_prompt_tokens': 0, 'llm_completion_tokens': 0, 'llm_latency_seconds': 0.0}
+
+
+class JobProfile:
+    # Per-job, per-stage wall time, CPU time, peak RSS and LLM usage.
+    # CPU time is process-wide (torch and CTranslate2 compute in their own
+    # threads), so stages that overlap in concurrent mode share it.
+    def __init__(self, sample_interval=0.2):
+        self.sample_interval = sample_interval
+        self.audio_seconds = None
+        self.stages = {}
+        self._active = []
+        self._lock = threading.Lock()
+        self._started = None
+        self._cpu_started = None
+        self._wall = None
+        self._cpu = None
+        self._peak_rss = 0
+        self._token = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        # Makes this the profile of the current context and samples RSS in
+        # the background until stop()
+        self._started, self._cpu_started = time.perf_counter(), time.process_time()
+        self._sample()
+        self._token = _current_profile.set(self)
+        threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True).start()
+
+    def stop(self):
+        if self._token is None:
+            return
+        _current_profile.reset(self._token)
+        self._token = None
+        self._stopped.set()
+        self._wall = time.perf_counter() - self._started
+        self._cpu = time.process_time() - self._cpu_started
+        self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        with self._lock:
+            self._peak_rss = max(self._peak_rss, rss)
+            for record in self._active:
+                record['peak_rss_bytes'] = max(record['peak_rss_bytes'], rss)
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.sample_interval):
+            self._sample()
+
+    @contextmanager
+    def stage(self, name):
+        with self._lock:
+            record = self.stages.setdefault(name, _new_record())
+            self._active.append(record)
+        self._sample()
+        token = _current_stage.set(record)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            _current_stage.reset(token)
+            self._sample()
+            with self._lock:
+                record['wall_seconds'] += time.perf_counter() - started
+                record['cpu_seconds'] += time.process_time() - cpu_started
+                self._active.remove(record)
+
+    def record_llm_call(self, record, latency, prompt_tokens, completion_tokens):
+        with self._lock:
+            record['llm_requests'] += 1
+            record['llm_latency_seconds'] += latency
+            record['llm_prompt_tokens'] += prompt_tokens
+            record['llm_completion_tokens'] += completion_tokens
+
+    def as_dict(self):
+        def rtf(seconds):
+            return round(seconds / self.audio_seconds, 4) if self.audio_seconds else None
+
+        with self._lock:
+            wall = self._wall if self._wall is not None else time.perf_counter() - self._started
+            cpu = self._cpu if self._cpu is not None else time.process_time() - self._cpu_started
+            stages = {}
+            for name, record in self.stages.items():
+                stages[name] = {'wall_seconds': round(record['wall_seconds'], 3),
+                                'cpu_seconds': round(record['cpu_seconds'], 3),
+                                'peak_rss_mb': round(record['peak_rss_bytes'] / 2 ** 20, 1),
+                                'real_time_factor': rtf(record['wall_seconds'])}
+                if record['llm_requests']:
+                    stages[name]['llm'] = {'requests': record['llm_requests'],
+                                           'prompt_tokens': record['llm_prompt_tokens'],
+                                           'completion_tokens': record['llm_completion_tokens'],
+                                           'latency_seconds': round(record['llm_latency_seconds'], 3)}
+            return {'audio_seconds': round(self.audio_seconds, 3) if self.audio_seconds else None,
+                    'wall_seconds': round(wall, 3),
+                    'cpu_seconds': round(cpu, 3),
+                    'peak_rss_mb': round(self._peak_rss / 2 ** 20, 1),
+                    'real_time_factor': rtf(wall),
+                    'stages': stages}
+
+
+@contextmanager
+def stage(name):
+    # Times a pipeline stage of the current job; a no-op outside of a profile
+    profile = _current_profile.get()
+    if profile is None:
+        yield None
+        return
+    with profile.stage(name) as record:
+        yield record
+
+
+def _token_usage(response):
+    # ChatOpenAI reports OpenAI-style token_usage, Ollama the eval counts of
+    # each generation
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    if usage:
+        return usage.get('prompt_tokens', 0) or 0, usage.get('completion_tokens', 0) or 0
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            info = generation.generation_info or {}
+            prompt_tokens += info.get('prompt_eval_count', 0) or 0
+            completion_tokens += info.get('eval_count', 0) or 0
+    return prompt_tokens, completion_tokens
+
+
+class _LLMUsage:
+    # Attached to the langchain models: adds latency and token counts of
+    # every request to the stage that made it. Run inline: llm_client's loop
+    # already runs each request in the caller's context
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), _current_profile.get(), _current_stage.get())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), _current_profile.get(), _current_stage.get())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, profile, record = self._started.pop(run_id, (None, None, None))
+        if profile is None or record is None:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        profile.record_llm_call(record, time.perf_counter() - started, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+_llm_usage = None
+_llm_usage_lock = threading.Lock()
+
+
+def llm_usage_callback():
+    # Created with the first model, so that importing this module (and the
+    # pipeline) doesn't import langchain_core
+    global _llm_usage
+    with _llm_usage_lock:
+        if _llm_usage is None:
+            from langchain_core.callbacks import BaseCallbackHandler
+
+            class LLMUsageCallback(_LLMUsage, BaseCallbackHandler):
+                pass
+
+            _llm_usage = LLMUsageCallback()
+        return _llm_usage
+
+
+_STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class PipelineMetrics:
+    # Aggregates finished job profiles for the Prometheus /metrics endpoint
+    # (text exposition format, no client library needed)
+    def __init__(self, prefix='call_summarizer'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._audio_seconds = 0.0
+        self._processing_seconds = 0.0
+        self._stage_seconds = {}
+        self._stage_cpu_seconds = {}
+        self._stage_peak_rss = {}
+        self._stage_buckets = {}
+        self._stage_count = {}
+        self._llm = {}
+        self._last_real_time_factor = None
+
+    def observe_job_status(self, status):
+        with self._lock:
+            self._jobs[status] = self._jobs.get(status, 0) + 1
+
+    def observe_profile(self, timings):
+        with self._lock:
+            self._audio_seconds += timings.get('audio_seconds') or 0.0
+            self._processing_seconds += timings['wall_seconds']
+            if timings.get('real_time_factor') is not None:
+                self._last_real_time_factor = timings['real_time_factor']
+            for name, stage_timings in timings['stages'].items():
+                seconds = stage_timings['wall_seconds']
+                self._stage_seconds[name] = self._stage_seconds.get(name, 0.0) + seconds
+                self._stage_cpu_seconds[name] = self._stage_cpu_seconds.get(name, 0.0) + stage_timings['cpu_seconds']
+                self._stage_peak_rss[name] = max(self._stage_peak_rss.get(name, 0.0), stage_timings['peak_rss_mb'])
+                self._stage_count[name] = self._stage_count.get(name, 0) + 1
+                buckets = self._stage_buckets.setdefault(name, [0] * len(_STAGE_BUCKETS))
+                for i, bound in enumerate(_STAGE_BUCKETS):
+                    if seconds <= bound:
+                        buckets[i] += 1
+                llm = stage_timings.get('llm')
+                if llm:
+                    totals = self._llm.setdefault(name, {'requests': 0, 'prompt_tokens': 0,
+                                                         'completion_tokens': 0, 'latency_seconds': 0.0})
+                    for key in totals:
+                        totals[key] += llm[key]
+
+    def render(self, gauges=None, counters=None):
+        # gauges, counters: extra {name: value} sampled at scrape time (e.g.
+        # queue length, cache hits); counter names get the _total suffix
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            metric('jobs_total', 'counter', 'Finished jobs by outcome',
+                   [({'status': status}, count) for status, count in sorted(self._jobs.items())])
+            metric('audio_seconds_total', 'counter', 'Seconds of audio processed', [({}, self._audio_seconds)])
+            metric('processing_seconds_total', 'counter', 'Wall-clock seconds spent in the pipeline',
+                   [({}, self._processing_seconds)])
+            if self._last_real_time_factor is not None:
+                metric('real_time_factor', 'gauge', 'Processing time / audio duration of the last job',
+                       [({}, self._last_real_time_factor)])
+
+            name = f"{self.prefix}_stage_seconds"
+            lines.append(f"# HELP {name} Wall-clock time per pipeline stage")
+            lines.append(f"# TYPE {name} histogram")
+            for stage_name in sorted(self._stage_count):
+                for bound, count in zip(_STAGE_BUCKETS, self._stage_buckets[stage_name]):
+                    lines.append(f'{name}_bucket{{stage="{stage_name}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{stage="{stage_name}",le="+Inf"}} {self._stage_count[stage_name]}')
+                lines.append(f'{name}_sum{{stage="{stage_name}"}} {self._stage_seconds[stage_name]}')
+                lines.append(f'{name}_count{{stage="{stage_name}"}} {self._stage_count[stage_name]}')
+
+            metric('stage_cpu_seconds_total', 'counter', 'Process CPU time per pipeline stage',
+                   [({'stage': name}, value) for name, value in sorted(self._stage_cpu_seconds.items())])
+            metric('stage_peak_rss_megabytes', 'gauge', 'Highest resident memory seen during a stage',
+                   [({'stage': name}, value) for name, value in sorted(self._stage_peak_rss.items())])
+            for key, kind, help_text in (('requests', 'counter', 'LLM requests'),
+                                         ('prompt_tokens', 'counter', 'LLM prompt tokens'),
+                                         ('completion_tokens', 'counter', 'LLM completion tokens'),
+                                         ('latency_seconds', 'counter', 'Total LLM request latency')):
+                metric(f'llm_{key}_total', kind, help_text,
+                       [({'stage': name}, totals[key]) for name, totals in sorted(self._llm.items())])
+
+        for name, value in (gauges or {}).items():
+            metric(name, 'gauge', name.replace('_', ' ').capitalize(), [({}, value)])
+        for name, value in (counters or {}).items():
+            metric(f'{name}_total', 'counter', name.replace('_', ' ').capitalize(), [({}, value)])
+        return '\n'.join(lines) + '\n'
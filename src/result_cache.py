@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+class ResultCache:
+    # On-disk cache of per-stage pipeline outputs. Entries are keyed by the audio
+    # content hash plus the settings of the stage that produced them (model names,
+    # language, prompt), so a changed model simply misses. Each entry is a JSON file
+    # under <cache_dir>/<stage>/, its mtime is the LRU clock.
+    def __init__(self, cache_dir='data/cache', max_size_mb=1024):
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def file_hash(audio_file, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(audio_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _key(audio_hash, settings):
+        payload = json.dumps({'audio': audio_hash, 'settings': settings}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, audio_hash, stage, settings):
+        return os.path.join(self.cache_dir, stage, f"{self._key(audio_hash, settings)}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def contains(self, audio_hash, stage, settings):
+        return os.path.exists(self._path(audio_hash, stage, settings))
+
+    def get(self, audio_hash, stage, settings):
+        path = self._path(audio_hash, stage, settings)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry['value']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError) as e:
+            logging.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def set(self, audio_hash, stage, settings, value):
+        path = self._path(audio_hash, stage, settings)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({'audio': audio_hash, 'stage': stage, 'settings': settings, 'value': value},
+                          ensure_ascii=False).encode('utf-8')
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += len(data) - previous
+            if self._size > self.max_size:
+                self._evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used entries until
+        # the cache is back under 90% of its budget
+        target = self.max_size * 0.9
+        for path, size, _ in sorted(self._entries(), key=lambda x: x[2]):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, stage=None, **settings):
+        # e.g. invalidate('summary', model='llama3') after re-pulling a model
+        # under the same name; without settings the whole stage is dropped
+        removed = 0
+        root = os.path.join(self.cache_dir, stage) if stage else self.cache_dir
+        if not os.path.isdir(root):
+            return removed
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(dirpath, name)
+                if settings:
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            entry_settings = json.load(f).get('settings', {})
+                    except (ValueError, OSError):
+                        entry_settings = {}
+                    if any(entry_settings.get(k) != v for k, v in settings.items()):
+                        continue
+                self._remove(path)
+                removed += 1
+        return removed
+
+
+class ContentCache:
+    # ResultCache entries keyed by a text instead of an audio file, e.g. the
+    # summaries of transcript chunks: the same chunk text with the same
+    # settings is summarized once, whichever call or edit it comes from
+    def __init__(self, cache, stage, settings):
+        self.cache = cache
+        self.stage = stage
+        self.settings = settings
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, text):
+        return self.cache.get(self._hash(text), self.stage, self.settings)
+
+    def set(self, text, value):
+        self.cache.set(self._hash(text), self.stage, self.settings, value)
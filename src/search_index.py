@@ -0,0 +1,131 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+class SearchIndex:
+    # Persistent full-text index of processed calls (SQLite FTS5): dialogue
+    # segments with their speaker and time offsets, and the extracted action
+    # items. Rows live in `entries` (indexed by call, so a call is replaced or
+    # removed without scanning the index) and entries_fts is an external
+    # content FTS5 table kept in sync by triggers. Safe to use from several
+    # threads and from forked pipeline processes.
+    def __init__(self, path='data/search.db'):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS calls (
+                    call_id TEXT PRIMARY KEY,
+                    title TEXT, duration REAL, indexed_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    call_id TEXT NOT NULL REFERENCES calls (call_id) ON DELETE CASCADE,
+                    kind TEXT NOT NULL,
+                    speaker TEXT, start REAL, "end" REAL, deadline TEXT,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_call_id ON entries (call_id);
+                -- unicode61 folds case and diacritics (ё/е) for Cyrillic too;
+                -- there is no Russian stemmer, queries use prefix terms instead
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    text, speaker, content='entries', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts (rowid, text, speaker) VALUES (new.id, new.text, new.speaker);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, text, speaker)
+                    VALUES ('delete', old.id, old.text, old.speaker);
+                END;
+            ''')
+
+    def _connect(self):
+        # one connection per thread; a forked child opens its own instead of
+        # using the parent's
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def add_call(self, call_id, result, title=None):
+        # Indexes (or re-indexes) one pipeline result in a single transaction
+        dialogue = result.get('dialogue') or []
+        rows = [(call_id, 'segment', segment['speaker'], segment['start'], segment['end'], None,
+                 segment['text'].strip())
+                for segment in dialogue if segment['text'] and segment['text'].strip()]
+        for action in result.get('actions') or []:
+            text = ' '.join(part for part in (action.get('title'), action.get('details')) if part)
+            rows.append((call_id, 'action', action.get('responsible'), None, None, action.get('deadline'), text))
+        duration = dialogue[-1]['end'] if dialogue else None
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE call_id = ?', (call_id, ))
+            conn.execute('INSERT OR REPLACE INTO calls (call_id, title, duration, indexed_at) VALUES (?, ?, ?, ?)',
+                         (call_id, title, duration, time.time()))
+            conn.executemany('INSERT INTO entries (call_id, kind, speaker, start, "end", deadline, text) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        logging.info(f"Indexed call {call_id}: {len(rows)} entries")
+
+    def remove_call(self, call_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE call_id = ?', (call_id, ))
+            conn.execute('DELETE FROM calls WHERE call_id = ?', (call_id, ))
+
+    @staticmethod
+    def _match_query(query):
+        # User input to an FTS5 query: every word must occur, as a prefix so
+        # that "клиент" also finds "клиента", "клиентом"; FTS syntax in the
+        # input is treated as plain text
+        words = re.findall(r'\w+', query.lower())
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, query, limit=20, offset=0, kind=None, call_id=None):
+        # Hits ranked by BM25 (segment text weighs more than the speaker
+        # name), with a highlighted snippet; returns (hits, total)
+        match = self._match_query(query)
+        if not match:
+            return [], 0
+        filters, params = '', [match]
+        if kind is not None:
+            filters += ' AND e.kind = ?'
+            params.append(kind)
+        if call_id is not None:
+            filters += ' AND e.call_id = ?'
+            params.append(call_id)
+
+        conn = self._connect()
+        total = conn.execute(f'SELECT COUNT(*) FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid '
+                             f'WHERE entries_fts MATCH ?{filters}', params).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT e.call_id, c.title, e.kind, e.speaker, e.start, e."end", e.deadline, e.text,
+                   snippet(entries_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet,
+                   bm25(entries_fts, 1.0, 0.3) AS score
+            FROM entries_fts
+            JOIN entries e ON e.id = entries_fts.rowid
+            JOIN calls c ON c.call_id = e.call_id
+            WHERE entries_fts MATCH ?{filters}
+            ORDER BY score
+            LIMIT ? OFFSET ?''', params + [limit, offset]).fetchall()
+        hits = [{'callId': row['call_id'], 'title': row['title'], 'kind': row['kind'], 'speaker': row['speaker'],
+                 'start': row['start'], 'end': row['end'], 'deadline': row['deadline'], 'text': row['text'],
+                 'snippet': row['snippet'], 'score': round(-row['score'], 4)}
+                for row in rows]
+        return hits, total
+
+    def stats(self):
+        conn = self._connect()
+        return {'calls': conn.execute('SELECT COUNT(*) FROM calls').fetchone()[0],
+                'entries': conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]}
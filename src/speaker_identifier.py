@@ -1,40 +1,203 @@
 import logging
 import os
 
-from pyannote.audio import Pipeline
-from pyannote.audio.pipelines.utils.hook import ProgressHook
+import numpy as np
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from audio_loader import SAMPLE_RATE, load_audio_mmap
+from model_registry import ModelRegistry
+
+
+# pyannote 3.1 clusters normalized embeddings with centroid linkage at this
+# distance; used for the global clustering of windowed diarization when the
+# loaded pipeline doesn't expose its own
+CLUSTER_THRESHOLD = 0.7045654963945799
+
+
+def has_embedding(embedding):
+    # pyannote pads the embeddings of speakers without a centroid with zeros
+    # (NaN in some versions); neither can be normalized for clustering
+    return bool(np.isfinite(embedding).all()) and float(np.linalg.norm(embedding)) > 1e-6
+
 
 class SpeakerIdentifier:
-    def __init__(self):
+    def __init__(self, models=None, window_seconds=None, window_overlap=None):
         self.hf_token = os.getenv("HF_TOKEN") # Requires Hugging Face token: set HF_TOKEN environment variable
         self.model_name = "pyannote/speaker-diarization-3.1"
         self.min_speakers = 1
         self.max_speakers = 5
-        self.pipeline = None
+        # Recordings longer than window_seconds are diarized in overlapping
+        # windows from a memory-mapped buffer, so memory doesn't grow with the
+        # duration (0 or None: whole file at once)
+        self.window_seconds = window_seconds or int(os.getenv('DIARIZATION_WINDOW_SECONDS', '0'))
+        self.window_overlap = window_overlap or int(os.getenv('DIARIZATION_WINDOW_OVERLAP', '30'))
+        if self.window_seconds and self.window_seconds <= 2 * self.window_overlap:
+            raise ValueError("Diarization window must be longer than twice the overlap")
 
-        self._load_pipeline()
+        # the pyannote pipeline is loaded on first use and may be unloaded when idle
+        self.models = models or ModelRegistry()
+        self.models.register('speaker_identifier', self._load_pipeline)
+
+    @property
+    def pipeline(self):
+        return self.models.get('speaker_identifier')
 
     def _load_pipeline(self):
+        from pyannote.audio import Pipeline
         try:
             logging.info(f"Loading speaker diarization model ({self.model_name})")
-            self.pipeline = Pipeline.from_pretrained(self.model_name,
-                                                use_auth_token=self.hf_token)
+            return Pipeline.from_pretrained(self.model_name,
+                                            use_auth_token=self.hf_token)
         except Exception as e:
             logging.error(f"Failed to load model: {e}")
             raise
 
-    def identify_speakers(self, audio_file):
-        with ProgressHook() as hook:
-            diarization = self.pipeline(audio_file, 
-                                        hook=hook,
+    def identify_speakers(self, audio, hook=None):
+        # hook is called with pyannote's (step_name, step_artifact, ...) after
+        # every batch of every step; raising from it aborts the diarization
+        import torch
+        from pyannote.audio.pipelines.utils.hook import ProgressHook
+
+        if self.window_seconds:
+            waveform = audio if isinstance(audio, np.ndarray) else load_audio_mmap(audio)
+            if len(waveform) > (self.window_seconds + self.window_overlap) * SAMPLE_RATE:
+                return self._identify_windowed(waveform, hook)
+            audio = waveform
+        if isinstance(audio, np.ndarray):
+            # in-memory buffer from audio_loader.load_audio, no second decode
+            audio = {'waveform': torch.from_numpy(audio).unsqueeze(0),
+                     'sample_rate': SAMPLE_RATE}
+        with ProgressHook() as progress_hook, self.models.using('speaker_identifier') as pipeline:
+            def step_hook(*args, **kwargs):
+                if hook is not None:
+                    hook(*args, **kwargs)
+                progress_hook(*args, **kwargs)
+
+            diarization = pipeline(audio, 
+                                        hook=step_hook,
                                         min_speakers=self.min_speakers, 
                                         max_speakers=self.max_speakers)
         return diarization
     
+    def _windows(self, duration):
+        # [(start, end, keep_start, keep_end)] in seconds: consecutive windows
+        # overlap by window_overlap, and each keeps the turns up to the middle
+        # of its overlaps, where it has context on both sides
+        bounds, start = [], 0.0
+        while True:
+            end = min(start + self.window_seconds, duration)
+            bounds.append((start, end))
+            if end >= duration:
+                break
+            start = end - self.window_overlap
+        windows = []
+        for i, (start, end) in enumerate(bounds):
+            keep_start = (start + bounds[i - 1][1]) / 2 if i > 0 else 0.0
+            keep_end = (bounds[i + 1][0] + end) / 2 if i + 1 < len(bounds) else duration
+            windows.append((start, end, keep_start, keep_end))
+        return windows
+
+    def _identify_windowed(self, waveform, hook=None):
+        # Each window is diarized on its own with its speaker embeddings; the
+        # embeddings of all windows are then clustered together so a speaker
+        # keeps one label over the whole recording. Only one window is in
+        # memory at a time (a copy of the memory-mapped slice).
+        import torch
+        from pyannote.audio.pipelines.utils.hook import ProgressHook
+        from pyannote.core import Annotation, Segment
+
+        turns, embeddings = [], []
+        windows = self._windows(len(waveform) / SAMPLE_RATE)
+        with ProgressHook() as progress_hook, self.models.using('speaker_identifier') as pipeline:
+            def step_hook(*args, **kwargs):
+                if hook is not None:
+                    hook(*args, **kwargs)
+                progress_hook(*args, **kwargs)
+
+            for start, end, keep_start, keep_end in windows:
+                chunk = np.array(waveform[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+                diarization, window_embeddings = pipeline({'waveform': torch.from_numpy(chunk).unsqueeze(0),
+                                                           'sample_rate': SAMPLE_RATE},
+                                                          hook=step_hook,
+                                                          min_speakers=1,
+                                                          max_speakers=self.max_speakers,
+                                                          return_embeddings=True)
+                for label, embedding in zip(diarization.labels(), window_embeddings):
+                    # speakers the window's clustering found no centroid for
+                    # (too little clean speech) get a zero vector as padding;
+                    # their few turns are dropped
+                    if not has_embedding(embedding):
+                        continue
+                    for segment in diarization.label_timeline(label):
+                        turn_start, turn_end = max(start + segment.start, keep_start), min(start + segment.end, keep_end)
+                        if turn_end > turn_start:
+                            turns.append((turn_start, turn_end, len(embeddings)))
+                    embeddings.append(embedding)
+                chunk = None
+
+            clusters = self._cluster_embeddings(np.stack(embeddings), pipeline) if embeddings else []
+        logging.info(f"Windowed diarization: {len(windows)} windows, {len(embeddings)} local speakers, "
+                     f"{len(set(clusters))} global")
+
+        # speakers are named by order of first appearance, like pyannote's
+        names = {}
+        annotation = Annotation()
+        for turn_start, turn_end, local in sorted(turns):
+            cluster = int(clusters[local])
+            annotation[Segment(turn_start, turn_end)] = names.setdefault(cluster, f'SPEAKER_{len(names):02d}')
+        # joins the turns of one speaker cut at window boundaries
+        return annotation.support()
+
+    def _cluster_embeddings(self, embeddings, pipeline):
+        from scipy.cluster.hierarchy import fcluster, linkage
+
+        if len(embeddings) == 1:
+            return np.zeros(1, dtype=int)
+        clustering = getattr(pipeline, 'clustering', None)
+        threshold = float(getattr(clustering, 'threshold', CLUSTER_THRESHOLD))
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        tree = linkage(normalized, method='centroid', metric='euclidean')
+        clusters = fcluster(tree, t=threshold, criterion='distance')
+        count = len(set(clusters))
+        if count > self.max_speakers:
+            clusters = fcluster(tree, t=self.max_speakers, criterion='maxclust')
+        elif count < self.min_speakers:
+            clusters = fcluster(tree, t=min(self.min_speakers, len(embeddings)), criterion='maxclust')
+        return clusters - 1
+
+    def is_single_speaker(self, waveform, regions, window=3.0, max_windows=8, threshold=0.5):
+        # Cheap check before full diarization: embeds a few windows spread over
+        # the speech regions and compares them pairwise. Only a clearly single
+        # voice (every cosine distance below threshold) returns True.
+        import torch
+
+        if self.min_speakers > 1:
+            return False
+
+        starts = []
+        for start, end in regions:
+            t = start
+            while t + window <= end:
+                starts.append(t)
+                t += window
+        if len(starts) < 2:
+            return False
+        picked = [starts[i] for i in np.linspace(0, len(starts) - 1, min(max_windows, len(starts))).astype(int)]
+
+        length = int(window * SAMPLE_RATE)
+        batch = torch.stack([torch.from_numpy(waveform[int(t * SAMPLE_RATE):int(t * SAMPLE_RATE) + length])
+                             for t in picked]).unsqueeze(1)
+        with self.models.using('speaker_identifier') as pipeline:
+            embedding = getattr(pipeline, '_embedding', None)
+            if embedding is None:
+                return False
+            embeddings = np.asarray(embedding(batch))
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        distances = 1 - embeddings @ embeddings.T
+        return float(distances.max()) < threshold
+
     def get_segments_info(self, diarization):
         segments_info = []
         for segment, track, speaker in diarization.itertracks(yield_label=True):
@@ -1,55 +1,85 @@
 import logging
 import os
 
-import whisper
-from pydub import AudioSegment
+import numpy as np
+
+from audio_loader import load_audio
+from model_registry import ModelRegistry
 
 
 class SpeechRecognizer:
-    def __init__(self, model_size='small', language='ru', cache_enabled=True):
+    def __init__(self, model_size='small', language='ru', cache_enabled=True,
+                 engine=None, beam_size=None, cpu_threads=None, max_batch_size=None, max_wait_ms=None,
+                 stream_window=None, models=None):
         self.model_size = model_size
         self.language = language
-        self.model = None
-        self._load_model()
+        self.cache_enabled = cache_enabled
+        # whisper (PyTorch, fp32 on CPU), whisper-batched (shared batches across
+        # concurrent jobs) or faster-whisper (CTranslate2, int8)
+        self.engine_name = engine or os.getenv('ASR_ENGINE', 'whisper')
+        self.beam_size = beam_size or int(os.getenv('ASR_BEAM_SIZE', '1'))
+        self.cpu_threads = cpu_threads or int(os.getenv('ASR_CPU_THREADS', '0'))
+        self.max_batch_size = max_batch_size or int(os.getenv('ASR_MAX_BATCH_SIZE', '8'))
+        self.max_wait_ms = max_wait_ms or int(os.getenv('ASR_MAX_WAIT_MS', '50'))
+        # window length of stream_segments() for the whisper engines
+        self.stream_window = stream_window or int(os.getenv('ASR_STREAM_WINDOW_SECONDS', '60'))
+        # the engine is loaded on first use and may be unloaded when idle
+        self.models = models or ModelRegistry()
+        self.models.register('speech_recognizer', self._load_model)
 
+    @property
+    def engine(self):
+        return self.models.get('speech_recognizer')
 
     def _load_model(self):
+        from asr_engines import create_asr_engine
         try:
-            logging.info(f"Loading Whisper model ({self.model_size})")
-            self.model = whisper.load_model(self.model_size)
+            if self.engine_name == 'faster-whisper':
+                return create_asr_engine(self.engine_name, model_size=self.model_size,
+                                         beam_size=self.beam_size, cpu_threads=self.cpu_threads)
+            if self.engine_name == 'whisper-batched':
+                return create_asr_engine(self.engine_name, model_size=self.model_size,
+                                         max_batch_size=self.max_batch_size, max_wait_ms=self.max_wait_ms)
+            return create_asr_engine(self.engine_name, model_size=self.model_size)
         except Exception as e:
             logging.error(f"Failed to load model: {e}")
             raise
 
-    def _preprocess_audio(self, audio_file):
-        try:
-            audio = AudioSegment.from_file(audio_file)
-            audio = audio.set_frame_rate(16000).set_channels(1)
-            temp_path = "data/temp_audio.wav"
-            audio.export(temp_path, format="wav")
-            return temp_path
-        except Exception as e:
-            logging.error(f"Audio preprocessing failed: {e}")
-            raise
+    def settings(self, streaming=False):
+        # everything that changes the transcript, used in cache keys; built from
+        # the configuration so that a cache lookup never loads the model
+        if self.engine_name == 'faster-whisper':
+            return {'model': f"faster-whisper-{self.model_size}", 'compute_type': 'int8', 'beam_size': self.beam_size}
+        # streamed windows are transcribed without each other's context
+        stream = {'stream_window': self.stream_window} if streaming else {}
+        if self.engine_name == 'whisper-batched':
+            # independent fixed windows give a different transcript than transcribe()
+            return {'model': f"whisper-{self.model_size}", 'batched': True, **stream}
+        return {'model': f"whisper-{self.model_size}", **stream}
 
-    def recognition(self, audio_file, language=None):
+    def _preprocess_audio(self, audio):
+        if isinstance(audio, np.ndarray):
+            return audio
+        return load_audio(audio)
+
+    def recognition(self, audio, language=None, window_hook=None):
+        # window_hook(done_seconds, total_seconds) runs as decoding advances;
+        # raising from it aborts the transcription
         lang = language or self.language
-        processed_audio_file = self._preprocess_audio(audio_file)
+        waveform = self._preprocess_audio(audio)
         try:
-            result = self.model.transcribe(processed_audio_file, language=lang)
+            with self.models.using('speech_recognizer') as engine:
+                result = engine.transcribe(waveform, lang, window_hook=window_hook)
             return result
         except Exception as e:
             logging.error(f"Recognition failed: {e}")
             raise
-        finally:
-            os.remove(processed_audio_file)
-            logging.info(f"Temporary file {processed_audio_file} deleted.")
 
-    def speech_to_text(self, audio_file):
+    def speech_to_text(self, audio, window_hook=None):
         segments = []
         keys = ['id', 'start', 'end', 'text']
 
-        recognition_result = self.recognition(audio_file)
+        recognition_result = self.recognition(audio, window_hook=window_hook)
 
         for segment in recognition_result['segments']:
             segments.append({key: segment[key] for key in keys})
@@ -57,10 +87,22 @@ class SpeechRecognizer:
         return {'text': recognition_result['text'],
                 'segments': segments
         }
+
+    def stream_segments(self, audio, language=None, window_hook=None):
+        # Generator of the speech_to_text segments, yielded as soon as they
+        # are decoded; the engine stays in use until the generator is exhausted
+        # or closed
+        lang = language or self.language
+        waveform = self._preprocess_audio(audio)
+        keys = ['id', 'start', 'end', 'text']
+        with self.models.using('speech_recognizer') as engine:
+            for i, segment in enumerate(engine.stream(waveform, lang, window_hook=window_hook,
+                                                      window_seconds=self.stream_window)):
+                yield {**{key: segment[key] for key in keys}, 'id': i}
         
 
 
 if __name__ == "__main__":
     # Usage example
     s = SpeechRecognizer()
-    print(s.recognition('data/4.wav')['segments'])
\ No newline at end of file
+    print(s.recognition('data/4.wav')['segments'])
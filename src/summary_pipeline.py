@@ -1,110 +1,525 @@
 import os
+import time
+import hashlib
 import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from utils import dialogue_to_markdown, summary_to_markdown
+from audio_loader import load_audio, load_audio_mmap, audio_duration
+from result_cache import ContentCache, ResultCache
+from model_registry import ModelRegistry
+from profiling import JobProfile, stage
+from vad import SpeechTimeline, VoiceActivityDetector
+from alignment import merge_diarization_and_recognition, merge_speaker_segments
 from llm_summarizer import OllamaSummarizer, OpenAISummarizer
 from actions_extractor import OllamaExtractor, OpenAiExtractor
+from call_analyzer import CallAnalyzer
 from speaker_identifier import SpeakerIdentifier
 from speech_recognition import SpeechRecognizer
+from search_index import SearchIndex
+
+
+@contextmanager
+def torch_threads(num_threads):
+    # torch.set_num_threads sizes the process-wide intra-op pool, so a budget
+    # holds only while nothing else in the process changes it: _run_stages sets
+    # it once around stages that run side by side (separate jobs in the same
+    # process still share it; PIPELINE_PROCESSES isolates them)
+    if not num_threads:
+        yield
+        return
+    import torch
+    previous = torch.get_num_threads()
+    torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+class PipelineCancelled(RuntimeError):
+    pass
+
+
+class CancelCheck:
+    # Heavy stages poll this from their inner loops (every Whisper window,
+    # every pyannote batch), so the user-supplied check is rate-limited
+    def __init__(self, cancel_check=None, interval=0.5):
+        self.cancel_check = cancel_check
+        self.interval = interval
+        self._last_check = 0.0
+        self._cancelled = False
+
+    def __call__(self, *args, **kwargs):
+        if self.cancel_check is None:
+            return
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_check >= self.interval:
+            self._last_check = now
+            self._cancelled = bool(self.cancel_check())
+        if self._cancelled:
+            raise PipelineCancelled("Cancelled by user")
+
+
+class ProgressReporter:
+    # One per run, so the current stage (last_step) belongs to the job even
+    # when several jobs share the pipeline. Stages may overlap in concurrent
+    # mode: callbacks are serialized and the reported progress is kept
+    # monotonic so clients never see it jump back
+    def __init__(self, progress_cb=None):
+        self.progress_cb = progress_cb
+        self.last_progress = 0
+        self.last_step = None
+        self.last_message = None
+        self._lock = threading.Lock()
+
+    def __call__(self, step, progress=None, message=None, **extra):
+        with self._lock:
+            if progress is not None:
+                progress = max(progress, self.last_progress)
+                self.last_progress = progress
+            self.last_step, self.last_message = step, message
+            if self.progress_cb:
+                self.progress_cb(step=step, progress=progress, message=message, **extra)
+
+    def update(self, **extra):
+        # Re-sends the current step with extra fields (partial results)
+        with self._lock:
+            if self.progress_cb:
+                self.progress_cb(step=self.last_step, progress=self.last_progress, message=self.last_message, **extra)
+
+
+class PartialTranscript:
+    # Streaming mode: the segments recognized so far, sent to the progress
+    # callback as `partial_dialogue` at most every `interval` seconds; once
+    # diarization is done they carry speakers like the final dialogue
+    def __init__(self, report, interval=2.0):
+        self.report = report
+        self.interval = interval
+        self.segments = []
+        self.speakers = None
+        self._lock = threading.Lock()
+        self._last_push = 0.0
+
+    def add(self, segment):
+        with self._lock:
+            self.segments.append(segment)
+        self._push()
+
+    def set_speakers(self, segments_info):
+        with self._lock:
+            self.speakers = segments_info
+        self._push(force=True)
+
+    def flush(self):
+        self._push(force=True)
+
+    def dialogue(self):
+        with self._lock:
+            segments, speakers = list(self.segments), self.speakers
+        if speakers is None:
+            return [{'speaker': None, 'text': segment['text'], 'start': segment['start'], 'end': segment['end']}
+                    for segment in segments]
+        return merge_diarization_and_recognition(speakers, segments, coalesce=True)
+
+    def _push(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_push < self.interval:
+            return
+        self._last_push = now
+        if self.segments:
+            self.report.update(partial_dialogue=self.dialogue())
 
 
 class SummaryPipeline:
-    def __init__(self):
-        self.summarizer = OpenAISummarizer()
-        self.actions_extractor = OpenAiExtractor()
-        self.speaker_identifier = SpeakerIdentifier()
-        self.speech_recognizer = SpeechRecognizer()
-        self.current_stage = None
+    def __init__(self, concurrent=False, asr_threads=None, diarization_threads=None,
+                 cache_enabled=True, cache_dir='data/cache', cache_max_size_mb=1024,
+                 vad=None, single_speaker_fast_path=False, model_idle_seconds=None, combined_analysis=False,
+                 streaming=False, incremental_summary=False, search_index=None,
+                 llm_chunk_tokens=None, llm_max_parallel=None):
+        # Whisper and pyannote are loaded on first use (or by warm_up()) and,
+        # with model_idle_seconds set, unloaded again after that long unused
+        self.models = ModelRegistry(idle_timeout=model_idle_seconds)
+        # llm_chunk_tokens, llm_max_parallel: map-reduce settings of the
+        # summarizer and the action extractor (None keeps their defaults,
+        # 0 chunk tokens sends every transcript in one prompt)
+        llm_settings = {name: value for name, value in (('chunk_tokens', llm_chunk_tokens),
+                                                        ('max_parallel', llm_max_parallel)) if value is not None}
+        self.summarizer = OpenAISummarizer(**llm_settings)
+        self.actions_extractor = OpenAiExtractor(**llm_settings)
+        # combined_analysis: summary and actions from one LLM request
+        # (CallAnalyzer), with the two separate requests as the fallback
+        self.combined_analysis = combined_analysis
+        # streaming: segments are reported while ASR runs, and the chunks of
+        # a long summary are sent to the LLM as soon as they are complete
+        self.streaming = streaming
+        # incremental_summary: long transcripts are split into content-defined
+        # chunks whose summaries are cached, so resummarize() after an edit
+        # only sends the changed chunks (needs the result cache)
+        self.incremental_summary = incremental_summary
+        # search_index: a search_index.SearchIndex; runs given a call_id add
+        # their dialogue and action items to it
+        self.search_index = search_index
+        self.speaker_identifier = SpeakerIdentifier(models=self.models)
+        self.speech_recognizer = SpeechRecognizer(models=self.models)
+
+        # Torch thread budgets of the two audio stages; in concurrent mode they
+        # run side by side on one pool of asr_threads + diarization_threads
+        # (by default all of the cores) instead of each sizing it for itself
+        self.concurrent = concurrent
+        half = max(1, (os.cpu_count() or 2) // 2)
+        self.asr_threads = asr_threads or (half if concurrent else None)
+        self.diarization_threads = diarization_threads or (half if concurrent else None)
+
+        self.cache = ResultCache(cache_dir, cache_max_size_mb) if cache_enabled else None
+
+        # vad: a vad.VoiceActivityDetector; ASR and diarization then only see
+        # the speech regions. The fast path skips diarization when the speech
+        # is found to come from a single voice.
+        self.vad = vad
+        self.single_speaker_fast_path = single_speaker_fast_path
 
     def _merge_speaker_segments(self, segments, eps=0.5):
-        merged_segments = []
-        i = 0
-        while i < len(segments):
-            cur_speaker = segments[i]['speaker']
-            merged_text = segments[i]['text']
-            start, end = segments[i]['start'], segments[i]['end']
-
-            j = i + 1
-            while j < len(segments) and segments[j]['speaker'] == cur_speaker:
-                merged_text += segments[j]['text']
-                end = segments[j]['end']
-                j += 1
-
-            merged_segments.append({
-                'speaker': cur_speaker,
-                'text': merged_text,
-                'start': start,
-                'end': end
-            })
-
-            i = j 
-
-        return merged_segments 
+        return merge_speaker_segments(segments)
     
-    def _merge_diarization_and_recognition(self, diarization_segments, recognition_segments, eps=0.1):
-        diarization_segments = sorted(diarization_segments, key=lambda x: x['start'])
-        recognition_segments = sorted(recognition_segments, key=lambda x: x['start'])
-
-        merged_segments = []
-        for recognition_segment in recognition_segments:
-            recognition_start, recognition_end = recognition_segment['start'], recognition_segment['end']
-            text = recognition_segment['text']
-
-            overlaps = []
-            for diarization_segment in diarization_segments:
-                diarization_start, diarization_end = diarization_segment['start'], diarization_segment['end']
-                speaker = diarization_segment['speaker']
-
-                start = max(recognition_start, diarization_start)
-                end = min(recognition_end, diarization_end)
-                overlap = end - start
-                
-                if overlap > 0:
-                    overlaps.append((speaker, overlap))
-
-            if len(overlaps) != 0:
-                speaker = max(overlaps, key=lambda x: x[1])[0]
-                merged_segments.append({
-                    'speaker': speaker,
-                    'text': text,
-                    'start': recognition_start,
-                    'end': recognition_end})
-        return merged_segments
-
-    def run(self, audio_file, progress_cb=None, *, flag_summary=True, flag_dialogue=True, flag_actions=True):
+    def _merge_diarization_and_recognition(self, diarization_segments, recognition_segments, eps=0.1, coalesce=False):
+        return merge_diarization_and_recognition(diarization_segments, recognition_segments, coalesce=coalesce)
+
+    def _stage_settings(self, stage):
+        # Everything that changes a stage's output goes into its cache key
+        def prompt_hash(prompt):
+            return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+        vad = self.vad.settings() if self.vad is not None else None
+        transcript = {**self.speech_recognizer.settings(streaming=self.streaming),
+                      'language': self.speech_recognizer.language,
+                      'vad': vad}
+        if stage == 'transcript':
+            return transcript
+        if stage == 'diarization':
+            return {'model': self.speaker_identifier.model_name,
+                    'min_speakers': self.speaker_identifier.min_speakers,
+                    'max_speakers': self.speaker_identifier.max_speakers,
+                    'window': (self.speaker_identifier.window_seconds, self.speaker_identifier.window_overlap)
+                              if self.speaker_identifier.window_seconds else None,
+                    'vad': vad,
+                    'single_speaker_fast_path': self.single_speaker_fast_path and vad is not None}
+        # a combined analysis answers differently from the separate prompts
+        combined = {}
+        if self.combined_analysis:
+            analyzer = self.analyzer
+            combined = {'combined': prompt_hash(analyzer.template + analyzer.chunk_template)}
+        if stage == 'summary':
+            return {'backend': type(self.summarizer).__name__,
+                    'model': self.summarizer.model_name,
+                    'prompt': prompt_hash(self.summarizer.summary_prompt + self.summarizer.chunk_prompt
+                                          + self.summarizer.reduce_prompt),
+                    'chunk_tokens': self.summarizer.chunk_tokens,
+                    'transcript': transcript,
+                    'incremental': self._chunk_cache() is not None,
+                    **combined}
+        if stage == 'chunk_summary':
+            # no transcript settings: keyed by the chunk text itself
+            return {'backend': type(self.summarizer).__name__,
+                    'model': self.summarizer.model_name,
+                    'prompt': prompt_hash(self.summarizer.chunk_prompt),
+                    'chunk_tokens': self.summarizer.chunk_tokens}
+        if stage == 'actions':
+            return {'backend': type(self.actions_extractor).__name__,
+                    'model': self.actions_extractor.model_name,
+                    'prompt': prompt_hash(self.actions_extractor.template),
+                    'chunk_tokens': self.actions_extractor.chunk_tokens,
+                    'transcript': transcript,
+                    **combined}
+        raise ValueError(f"Unknown stage: {stage}")
+
+    def _cache_active(self, audio_hash, stage):
+        if self.cache is None or audio_hash is None:
+            return False
+        return stage != 'transcript' or self.speech_recognizer.cache_enabled
+
+    def _cache_get(self, audio_hash, stage):
+        if not self._cache_active(audio_hash, stage):
+            return None
+        value = self.cache.get(audio_hash, stage, self._stage_settings(stage))
+        if value is not None:
+            logging.info(f"Using cached {stage} for audio {audio_hash[:12]}")
+        return value
+
+    def _cache_set(self, audio_hash, stage, value):
+        if self._cache_active(audio_hash, stage):
+            self.cache.set(audio_hash, stage, self._stage_settings(stage), value)
+        return value
+
+    def _cached(self, audio_hash, stage, compute):
+        value = self._cache_get(audio_hash, stage)
+        if value is None:
+            value = self._cache_set(audio_hash, stage, compute())
+        return value
+
+    def _recognize(self, waveform, report, audio_hash=None, cancel=None, timeline=None):
+        report('speech_recognition', 10, 'Распознаём речь...')
+        with stage('speech_recognition'):
+            recognition_result = self.speech_recognizer.speech_to_text(waveform, window_hook=cancel)
+        if timeline is not None:
+            recognition_result['segments'] = timeline.remap_segments(recognition_result['segments'])
+        return self._cache_set(audio_hash, 'transcript', recognition_result)
+
+    def _recognize_streaming(self, waveform, report, audio_hash=None, cancel=None, timeline=None,
+                             partial=None, incremental=None):
+        # Same result as _recognize, but every segment is passed on as soon as
+        # it is decoded: to the partial dialogue and the incremental summary
+        report('speech_recognition', 10, 'Распознаём речь...')
+        segments = []
+        with stage('speech_recognition'):
+            for segment in self.speech_recognizer.stream_segments(waveform, window_hook=cancel):
+                if timeline is not None:
+                    segment = timeline.remap_segments([segment])[0]
+                segments.append(segment)
+                partial.add(segment)
+                if incremental is not None:
+                    incremental.add(segment['text'])
+        partial.flush()
+        recognition_result = {'text': ''.join(segment['text'] for segment in segments), 'segments': segments}
+        return self._cache_set(audio_hash, 'transcript', recognition_result)
+
+    def _diarize(self, waveform, report, audio_hash=None, cancel=None, timeline=None, partial=None):
+        segments_info = self._diarize_segments(waveform, report, audio_hash, cancel, timeline)
+        if partial is not None:
+            partial.set_speakers(segments_info)
+        return segments_info
+
+    def _diarize_segments(self, waveform, report, audio_hash=None, cancel=None, timeline=None):
+        report('speaker_identification', 40, 'Определяем спикеров...')
+        with stage('speaker_identification'):
+            if timeline is not None and self.single_speaker_fast_path and \
+                    self.speaker_identifier.is_single_speaker(waveform, timeline.compact_regions()):
+                logging.info("Single speaker detected, skipping diarization")
+                segments_info = [{'speaker': 'SPEAKER_00', 'start': start, 'end': end}
+                                 for start, end in timeline.regions]
+                return self._cache_set(audio_hash, 'diarization', segments_info)
+            diarization = self.speaker_identifier.identify_speakers(waveform, hook=cancel)
+        segments_info = self.speaker_identifier.get_segments_info(diarization)
+        if timeline is not None:
+            segments_info = timeline.remap_segments(segments_info)
+        return self._cache_set(audio_hash, 'diarization', segments_info)
+
+    def _detect_speech(self, waveform, report):
+        # Returns the buffer to process and the timeline to map it back, or
+        # the untouched waveform when VAD is off or finds no speech at all
+        if self.vad is None:
+            return waveform, None
+        report('vad', 7, 'Ищем участки речи...')
+        with stage('vad'):
+            regions = self.vad.detect(waveform)
+        if not regions:
+            return waveform, None
+        timeline = SpeechTimeline(regions)
+        return timeline.compact(waveform), timeline
+
+    def _chunk_cache(self):
+        if not self.incremental_summary or self.cache is None or not self.summarizer.chunk_tokens:
+            return None
+        return ContentCache(self.cache, 'chunk_summary', self._stage_settings('chunk_summary'))
+
+    def _summarize(self, text, report, audio_hash=None, turns=None, incremental=None):
+        report('summarization', 80, 'Генерируем резюме...')
+
+        def compute():
+            # incremental: chunk summaries started during streaming ASR
+            summary = incremental.finish() if incremental is not None else None
+            if summary:
+                return summary
+            # the chunk cache filled here makes the first resummarize() fast:
+            # it is filled from the text the UI sends back, the dialogue turns
+            # joined with spaces (Whisper's text differs where alignment
+            # dropped or merged segments)
+            chunk_cache = self._chunk_cache()
+            if chunk_cache is not None:
+                return self.summarizer.cached_summarize(' '.join(turns) if turns else text, chunk_cache)
+            return self.summarizer.full_summarize(text, raise_errors=True, turns=turns)
+        try:
+            with stage('summarization'):
+                return self._cached(audio_hash, 'summary', compute)
+        except Exception as e:
+            # same fallback as full_summarize, but failed summaries never reach the cache
+            logging.error(f"Error during summarization: {e}")
+            return f"Error during processing: {e}"
+
+    def _extract_actions(self, text, report, audio_hash=None, turns=None):
+        report('actions', 90, 'Извлекаем задачи...')
+
+        def compute():
+            actions_obj = self.actions_extractor.extract(text, turns=turns)
+            return [a.dict() for a in getattr(actions_obj, 'actions', [])]
+        with stage('actions'):
+            return self._cached(audio_hash, 'actions', compute)
+
+    @property
+    def analyzer(self):
+        # built on demand: summarizer and actions_extractor may be swapped
+        return CallAnalyzer(self.summarizer, self.actions_extractor)
+
+    def _analyze(self, text, report, audio_hash=None, turns=None):
+        # Returns (summary, actions) like _summarize and _extract_actions
+        summary = self._cache_get(audio_hash, 'summary')
+        actions = self._cache_get(audio_hash, 'actions')
+        if summary is None and actions is None:
+            report('summarization', 80, 'Генерируем резюме и задачи...')
+            try:
+                with stage('analysis'):
+                    analysis = self.analyzer.analyze(text, turns=turns)
+                summary = self._cache_set(audio_hash, 'summary', analysis.summary)
+                actions = self._cache_set(audio_hash, 'actions', [a.dict() for a in analysis.actions.actions])
+            except Exception as e:
+                logging.warning(f"Combined analysis failed, falling back to separate requests: {e}")
+        if summary is None:
+            summary = self._summarize(text, report, audio_hash, turns)
+        if actions is None:
+            actions = self._extract_actions(text, report, audio_hash, turns)
+        return summary, actions
+
+    def _index(self, call_id, title, dialogue, actions):
+        # A failed indexing doesn't fail the job: the result is still returned
+        try:
+            with stage('indexing'):
+                self.search_index.add_call(call_id, {'dialogue': dialogue, 'actions': actions}, title=title)
+        except Exception as e:
+            logging.warning(f"Failed to index call {call_id}: {e}")
+
+    def resummarize(self, text):
+        # Summary of an edited transcript; with incremental_summary only the
+        # chunks touched by the edit are summarized again
+        chunk_cache = self._chunk_cache()
+        if chunk_cache is None:
+            return self.summarizer.full_summarize(text)
+        try:
+            return self.summarizer.cached_summarize(text, chunk_cache)
+        except Exception as e:
+            logging.error(f"Error during summarization: {e}")
+            return f"Error during processing: {e}"
+
+    def analyze_text(self, text):
+        # Summary and actions of a transcript in one combined request (with
+        # the separate requests as fallback), outside of run()
+        return self._analyze(text, ProgressReporter())
+
+    def _run_stages(self, stages, concurrent, threads=None):
+        # stages: {name: (fn, args)}; results are returned under the same names.
+        # threads: {name: torch threads}; side by side the stages share one
+        # pool of their combined budget
+        threads = threads or {}
+        if not concurrent or len(stages) < 2:
+            results = {}
+            for name, (fn, args) in stages.items():
+                with torch_threads(threads.get(name)):
+                    results[name] = fn(*args)
+            return results
+        budgets = [threads.get(name) for name in stages]
+        with torch_threads(sum(budgets) if all(budgets) else None), \
+                ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix='pipeline') as executor:
+            # stages run in a copy of the caller's context to keep it profiled
+            futures = {name: executor.submit(contextvars.copy_context().run, fn, *args)
+                       for name, (fn, args) in stages.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def run(self, audio_file, progress_cb=None, *, flag_summary=True, flag_dialogue=True, flag_actions=True,
+            concurrent=None, cancel_check=None, call_id=None, title=None):
+        # cancel_check() -> bool is polled inside ASR and diarization and
+        # between stages; a True result raises PipelineCancelled.
+        # call_id (and a display title) put the result in the search index
+        concurrent = self.concurrent if concurrent is None else concurrent
+        cancel = CancelCheck(cancel_check)
         summary = None
         dialogue_segments = None
         actions = None
+        report = ProgressReporter(progress_cb)
+        partial = PartialTranscript(report) if self.streaming else None
+        incremental = None
+        profile = JobProfile()
+        profile.start()
 
         try:
-            self.current_stage = 'speech_recognition'
-            if progress_cb: progress_cb(step='speech_recognition', progress=10, message='Распознаём речь...')
-            recognition_result = self.speech_recognizer.speech_to_text(audio_file)
+            audio_hash = None
+            if self.cache is not None and isinstance(audio_file, (str, os.PathLike)):
+                audio_hash = self.cache.file_hash(audio_file)
+
+            # A repeated upload with cached transcript and speakers is never decoded
+            recognition_result = self._cache_get(audio_hash, 'transcript')
+            segments_info = self._cache_get(audio_hash, 'diarization') if flag_dialogue else None
+
+            stages = {}
+            if recognition_result is None or (flag_dialogue and segments_info is None):
+                report('loading', 5, 'Загружаем аудио...')
+                with stage('loading'):
+                    # windowed diarization is meant for recordings too long to hold in memory
+                    if self.speaker_identifier.window_seconds and isinstance(audio_file, (str, os.PathLike)):
+                        waveform = load_audio_mmap(audio_file)
+                    else:
+                        waveform = load_audio(audio_file)
+                profile.audio_seconds = audio_duration(waveform)
+                waveform, timeline = self._detect_speech(waveform, report)
+                if recognition_result is None and self.streaming:
+                    # the chunk cache needs the complete text to find its chunks
+                    if flag_summary and not (flag_actions and self.combined_analysis) and \
+                            self.summarizer.chunk_tokens and self._chunk_cache() is None and \
+                            self._cache_get(audio_hash, 'summary') is None:
+                        # its chunk requests run in a copy of this context:
+                        # created in the stage, their LLM usage is counted there
+                        with stage('summarization'):
+                            incremental = self.summarizer.incremental()
+                    stages['recognition'] = (self._recognize_streaming,
+                                             (waveform, report, audio_hash, cancel, timeline, partial, incremental))
+                elif recognition_result is None:
+                    stages['recognition'] = (self._recognize, (waveform, report, audio_hash, cancel, timeline))
+                if flag_dialogue and segments_info is None:
+                    stages['diarization'] = (self._diarize, (waveform, report, audio_hash, cancel, timeline, partial))
+            audio_results = self._run_stages(stages, concurrent, threads={'recognition': self.asr_threads,
+                                                                          'diarization': self.diarization_threads})
+            waveform = None
+            cancel()
+            recognition_result = audio_results.get('recognition', recognition_result)
+            segments_info = audio_results.get('diarization', segments_info)
+
+            if profile.audio_seconds is None and recognition_result['segments']:
+                # audio was not decoded (cache hit): the transcript tells its length
+                profile.audio_seconds = recognition_result['segments'][-1]['end']
 
             if flag_dialogue:
-                self.current_stage = 'speaker_identification'
-                if progress_cb: progress_cb(step='speaker_identification', progress=40, message='Определяем спикеров...')
-                diarization = self.speaker_identifier.identify_speakers(audio_file)
-                segments_info = self.speaker_identifier.get_segments_info(diarization)
+                report('merge', 60, 'Сопоставляем реплики и спикеров...')
+                with stage('merge'):
+                    dialogue_segments = self._merge_diarization_and_recognition(segments_info,
+                                                                                recognition_result['segments'],
+                                                                                coalesce=True)
 
-                self.current_stage = 'merge'
-                if progress_cb: progress_cb(step='merge', progress=60, message='Сопоставляем реплики и спикеров...')
-                dialogue_segments = self._merge_diarization_and_recognition(segments_info, recognition_result['segments'])
-                dialogue_segments = self._merge_speaker_segments(dialogue_segments)
+            # Long transcripts are chunked for the LLM on speaker turns when
+            # the dialogue is known, otherwise on Whisper segments
+            if dialogue_segments:
+                turns = [segment['text'] for segment in dialogue_segments]
+            else:
+                turns = [segment['text'] for segment in recognition_result['segments']]
 
-            if flag_summary:
-                self.current_stage = 'summarization'
-                if progress_cb: progress_cb(step='summarization', progress=80, message='Генерируем резюме...')
-                summary = self.summarizer.full_summarize(recognition_result['text'])
+            stages = {}
+            if flag_summary and flag_actions and self.combined_analysis:
+                stages['analysis'] = (self._analyze, (recognition_result['text'], report, audio_hash, turns))
+            else:
+                if flag_summary:
+                    stages['summary'] = (self._summarize,
+                                         (recognition_result['text'], report, audio_hash, turns, incremental))
+                if flag_actions:
+                    stages['actions'] = (self._extract_actions, (recognition_result['text'], report, audio_hash, turns))
+            llm_results = self._run_stages(stages, concurrent)
+            summary, actions = llm_results.get('analysis', (llm_results.get('summary'), llm_results.get('actions')))
 
-            if flag_actions:
-                if progress_cb: progress_cb(step='actions', progress=90, message='Извлекаем задачи...')
-                actions_obj = self.actions_extractor.extract(recognition_result['text'])
-                actions = [a.dict() for a in getattr(actions_obj, 'actions', [])]
+            if self.search_index is not None and call_id is not None:
+                self._index(call_id, title, dialogue_segments, actions)
+
+            profile.stop()
+            report('done', 100, 'Готово', timings=profile.as_dict())
 
-            self.current_stage = 'done'
-            if progress_cb: progress_cb(step='done', progress=100, message='Готово')
-            
             result = {}
             if flag_summary:
                 result['summary'] = summary
@@ -113,11 +528,35 @@ class SummaryPipeline:
             if flag_actions:
                 result['actions'] = actions
             return result
+        except PipelineCancelled:
+            raise
         except Exception as e:
-            self.current_stage = 'failed'
             if progress_cb:
-                progress_cb(step='failed', message=str(e))
+                profile.stop()
+                progress_cb(step='failed', message=str(e), timings=profile.as_dict())
             raise
+        finally:
+            if incremental is not None:
+                incremental.close()
+            profile.stop()
+
+
+def pipeline_from_env():
+    # The pipeline as configured by the environment (see .env.example); used
+    # by the API and the batch CLI
+    return SummaryPipeline(
+        concurrent=os.getenv('PIPELINE_CONCURRENT', '0') == '1',
+        vad=VoiceActivityDetector(os.getenv('VAD_METHOD')) if os.getenv('VAD_METHOD') else None,
+        single_speaker_fast_path=os.getenv('VAD_SINGLE_SPEAKER', '0') == '1',
+        model_idle_seconds=int(os.getenv('MODEL_IDLE_SECONDS', '0')) or None,
+        combined_analysis=os.getenv('COMBINED_ANALYSIS', '0') == '1',
+        streaming=os.getenv('PIPELINE_STREAMING', '0') == '1',
+        incremental_summary=os.getenv('INCREMENTAL_SUMMARY', '0') == '1',
+        search_index=SearchIndex(os.getenv('SEARCH_INDEX_PATH', 'data/search.db'))
+        if os.getenv('SEARCH_INDEX', '0') == '1' else None,
+        llm_chunk_tokens=int(os.environ['LLM_CHUNK_TOKENS']) if os.getenv('LLM_CHUNK_TOKENS') else None,
+        llm_max_parallel=int(os.getenv('LLM_MAX_PARALLEL', '0')) or None,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import logging
+from bisect import bisect_right
+
+import numpy as np
+
+from audio_loader import SAMPLE_RATE, empty_mmap
+
+
+def _merge_regions(regions, min_speech, min_silence, pad, duration):
+    merged = []
+    for start, end in regions:
+        start, end = max(0.0, start - pad), min(duration, end + pad)
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [(start, end) for start, end in merged if end - start >= min_speech]
+
+
+class VoiceActivityDetector:
+    # 'energy' is a dependency-free detector that drops silence and line noise;
+    # 'silero' (pip install silero-vad) also rejects hold music and other
+    # non-speech sounds. Both return speech regions in seconds.
+    def __init__(self, method='energy', min_speech=0.25, min_silence=0.5, pad=0.2,
+                 frame_ms=30, threshold_db=12.0, floor_db=-55.0):
+        self.method = method
+        self.min_speech = min_speech
+        self.min_silence = min_silence
+        self.pad = pad
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.floor_db = floor_db
+        self._silero = None
+        if method == 'silero':
+            try:
+                from silero_vad import load_silero_vad, get_speech_timestamps
+            except ImportError as e:
+                raise ImportError("VAD method 'silero' requires: pip install silero-vad") from e
+            self._silero = (load_silero_vad(), get_speech_timestamps)
+        elif method != 'energy':
+            raise ValueError(f"Unknown VAD method: {method}")
+
+    def settings(self):
+        return {'method': self.method, 'min_speech': self.min_speech, 'min_silence': self.min_silence,
+                'pad': self.pad, 'threshold_db': self.threshold_db, 'floor_db': self.floor_db}
+
+    def _energy_regions(self, waveform, sample_rate):
+        frame = int(sample_rate * self.frame_ms / 1000)
+        n_frames = len(waveform) // frame
+        if n_frames == 0:
+            return []
+        # a minute of frames at a time: a memory-mapped recording is read
+        # block by block instead of being squared in RAM as a whole
+        energy = np.empty(n_frames, dtype=np.float32)
+        block = max(1, 60 * sample_rate // frame)
+        for i in range(0, n_frames, block):
+            frames = np.asarray(waveform[i * frame:min(i + block, n_frames) * frame]).reshape(-1, frame)
+            energy[i:i + block] = np.mean(frames ** 2, axis=1)
+        energy_db = 10 * np.log10(energy + 1e-10)
+        # adaptive threshold over the quietest tenth of the recording
+        noise_db = np.percentile(energy_db, 10)
+        speech = energy_db > max(noise_db + self.threshold_db, self.floor_db)
+
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        frame_seconds = frame / sample_rate
+        return [(float(s * frame_seconds), float(e * frame_seconds)) for s, e in zip(starts, ends)]
+
+    def _silero_regions(self, waveform, sample_rate):
+        import torch
+
+        model, get_speech_timestamps = self._silero
+        timestamps = get_speech_timestamps(torch.from_numpy(waveform), model,
+                                           sampling_rate=sample_rate, return_seconds=True)
+        return [(t['start'], t['end']) for t in timestamps]
+
+    def detect(self, waveform, sample_rate=SAMPLE_RATE):
+        if self.method == 'silero':
+            regions = self._silero_regions(waveform, sample_rate)
+        else:
+            regions = self._energy_regions(waveform, sample_rate)
+        regions = _merge_regions(regions, self.min_speech, self.min_silence, self.pad, len(waveform) / sample_rate)
+        speech = sum(end - start for start, end in regions)
+        logging.info(f"VAD: {len(regions)} speech regions, {speech:.1f}s of {len(waveform) / sample_rate:.1f}s")
+        return regions
+
+
+class SpeechTimeline:
+    # Speech regions laid end to end with a short silence between them. ASR and
+    # diarization run on the compacted buffer, and their timestamps are mapped
+    # back to the original recording with to_original().
+    def __init__(self, regions, gap=0.5):
+        self.regions = regions
+        self.gap = gap
+        self.offsets = []
+        t = 0.0
+        for start, end in regions:
+            self.offsets.append(t)
+            t += (end - start) + gap
+
+    def compact(self, waveform, sample_rate=SAMPLE_RATE):
+        # A memory-mapped recording (windowed diarization) is compacted into
+        # another memory-mapped buffer, so neither is held in RAM
+        bounds = [(int(start * sample_rate), min(int(end * sample_rate), len(waveform)))
+                  for start, end in self.regions]
+        gap = int(self.gap * sample_rate)
+        length = sum(end - start for start, end in bounds) + gap * max(len(bounds) - 1, 0)
+        if isinstance(waveform, np.memmap):
+            compacted = empty_mmap(length, dtype=waveform.dtype)
+        else:
+            compacted = np.zeros(length, dtype=waveform.dtype)
+        position = 0
+        for start, end in bounds:
+            compacted[position:position + end - start] = waveform[start:end]
+            position += end - start + gap
+        return compacted
+
+    def compact_regions(self):
+        return [(offset, offset + end - start) for offset, (start, end) in zip(self.offsets, self.regions)]
+
+    def to_original(self, t, side='right'):
+        # Times inside an inserted gap snap to the next region's start
+        # (side='right', for segment starts) or the previous region's end
+        # (side='left', for segment ends)
+        i = max(bisect_right(self.offsets, t) - 1, 0)
+        start, end = self.regions[i]
+        local = t - self.offsets[i]
+        if local <= end - start:
+            return start + max(local, 0.0)
+        if side == 'right' and i + 1 < len(self.regions):
+            return self.regions[i + 1][0]
+        return end
+
+    def remap_segments(self, segments):
+        remapped = []
+        for segment in segments:
+            start = self.to_original(segment['start'], side='right')
+            end = max(start, self.to_original(segment['end'], side='left'))
+            remapped.append({**segment, 'start': start, 'end': end})
+        return remapped
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the modules under src/ are imported as top-level modules, as api/main.py does
+sys.path.append(str(Path(__file__).parent.parent / "src"))
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from alignment import merge_diarization_and_recognition, merge_speaker_segments
+
+
+# The original O(n·m) implementation: every recognition segment is compared
+# with every diarization segment. The sweep-line merge must match it exactly.
+def reference_merge(diarization_segments, recognition_segments):
+    diarization_segments = sorted(diarization_segments, key=lambda x: x['start'])
+    recognition_segments = sorted(recognition_segments, key=lambda x: x['start'])
+    merged_segments = []
+    for recognition_segment in recognition_segments:
+        overlaps = []
+        for diarization_segment in diarization_segments:
+            overlap = min(recognition_segment['end'], diarization_segment['end']) - \
+                max(recognition_segment['start'], diarization_segment['start'])
+            if overlap > 0:
+                overlaps.append((diarization_segment['speaker'], overlap))
+        if overlaps:
+            merged_segments.append({'speaker': max(overlaps, key=lambda x: x[1])[0],
+                                    'text': recognition_segment['text'],
+                                    'start': recognition_segment['start'],
+                                    'end': recognition_segment['end']})
+    return merged_segments
+
+
+def reference_coalesce(segments):
+    merged_segments = []
+    i = 0
+    while i < len(segments):
+        speaker, text = segments[i]['speaker'], segments[i]['text']
+        start, end = segments[i]['start'], segments[i]['end']
+        j = i + 1
+        while j < len(segments) and segments[j]['speaker'] == speaker:
+            text += segments[j]['text']
+            end = segments[j]['end']
+            j += 1
+        merged_segments.append({'speaker': speaker, 'text': text, 'start': start, 'end': end})
+        i = j
+    return merged_segments
+
+
+def random_segments(rng, count, speakers=None, max_length=8.0, total=600.0):
+    segments = []
+    for index in range(count):
+        start = round(rng.uniform(0, total), 1)
+        segment = {'start': start, 'end': round(start + rng.uniform(0.1, max_length), 1)}
+        if speakers:
+            segment['speaker'] = f"SPEAKER_0{rng.randrange(speakers)}"
+        else:
+            segment['text'] = f" слово{index}"
+        segments.append(segment)
+    return segments
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_merge_matches_reference(seed):
+    rng = random.Random(seed)
+    diarization = random_segments(rng, rng.randint(0, 80), speakers=3, max_length=20.0)
+    recognition = random_segments(rng, rng.randint(0, 120))
+    assert merge_diarization_and_recognition(diarization, recognition) == reference_merge(diarization, recognition)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_coalesced_merge_matches_reference(seed):
+    rng = random.Random(seed)
+    diarization = random_segments(rng, 60, speakers=2, max_length=30.0)
+    recognition = random_segments(rng, 100)
+    expected = reference_coalesce(reference_merge(diarization, recognition))
+    assert merge_diarization_and_recognition(diarization, recognition, coalesce=True) == expected
+
+
+def test_equal_overlaps_keep_the_earliest_speaker():
+    diarization = [{'speaker': 'B', 'start': 1.0, 'end': 2.0}, {'speaker': 'A', 'start': 0.0, 'end': 1.0}]
+    recognition = [{'start': 0.5, 'end': 1.5, 'text': ' x'}]
+    assert merge_diarization_and_recognition(diarization, recognition) == reference_merge(diarization, recognition)
+    assert merge_diarization_and_recognition(diarization, recognition)[0]['speaker'] == 'A'
+
+
+def test_segments_without_speaker_are_dropped():
+    diarization = [{'speaker': 'A', 'start': 0.0, 'end': 1.0}]
+    recognition = [{'start': 0.2, 'end': 0.8, 'text': ' a'}, {'start': 1.0, 'end': 2.0, 'text': ' b'}]
+    assert [s['text'] for s in merge_diarization_and_recognition(diarization, recognition)] == [' a']
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_merge_speaker_segments_matches_reference(seed):
+    rng = random.Random(seed)
+    segments = [{'speaker': rng.choice('AB'), 'text': f" t{i}", 'start': float(i), 'end': i + 0.5}
+                for i in range(rng.randint(0, 50))]
+    assert merge_speaker_segments(segments) == reference_coalesce(segments)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from chunking import chunk_turns, content_defined_chunks, estimate_tokens, iter_chunks
+
+
+WORDS = 'проект отчёт срок задача клиент релиз бюджет встреча договор тест команда план'.split()
+
+
+def random_turns(rng, count, max_words=40):
+    turns = []
+    for _ in range(count):
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words))) + '.'
+                     for _ in range(rng.randint(1, 4))]
+        turns.append(' ' + ' '.join(sentences))
+    return turns
+
+
+def words(texts):
+    return ' '.join(texts).split()
+
+
+def characters(texts):
+    # over-budget sentences are cut between characters, not words
+    return ''.join(''.join(texts).split())
+
+
+@pytest.mark.parametrize('max_tokens', [20, 50, 200])
+def test_chunks_stay_within_budget_and_keep_all_text(max_tokens):
+    turns = random_turns(random.Random(max_tokens), 300)
+    chunks = list(iter_chunks(turns, max_tokens))
+    assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
+    assert characters(chunks) == characters(turns)
+
+
+def test_turns_are_not_split_when_they_fit():
+    turns = [' первая реплика.', ' вторая реплика.', ' третья реплика.']
+    chunks = chunk_turns(turns, max_tokens=8)
+    assert chunks == ['первая реплика.', 'вторая реплика.', 'третья реплика.']
+    assert chunk_turns(turns, max_tokens=1000) == ['первая реплика. вторая реплика. третья реплика.']
+
+
+def test_long_turn_is_split_on_sentences():
+    turn = ' '.join(f"Предложение номер {i}." for i in range(40))
+    chunks = chunk_turns(['коротко.', turn, 'после.'], max_tokens=30)
+    assert chunks[0] == 'коротко.' and chunks[-1] == 'после.'
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+
+
+def test_turn_without_sentences_is_split_within_budget():
+    chunks = chunk_turns(['а' * 1000], max_tokens=10)
+    assert ''.join(chunks) == 'а' * 1000
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
+
+
+def test_chunks_are_yielded_as_turns_arrive():
+    seen = []
+
+    def turns():
+        for turn in random_turns(random.Random(1), 50):
+            seen.append(turn)
+            yield turn
+
+    chunks = iter_chunks(turns(), max_tokens=40)
+    next(chunks)
+    assert 0 < len(seen) < 50
+    assert chunk_turns(random_turns(random.Random(1), 50), 40)[0] == chunk_turns(seen, 40)[0]
+
+
+def test_empty_turns_are_skipped():
+    assert chunk_turns(['', '   ', ' текст.'], max_tokens=10) == ['текст.']
+
+
+def test_content_defined_chunks_are_local_to_an_edit():
+    text = ' '.join(random_turns(random.Random(2), 400, max_words=10))
+    chunks = content_defined_chunks(text, max_tokens=2000)
+    assert len(chunks) > 5
+    assert all(estimate_tokens(chunk) <= 2000 for chunk in chunks)
+    assert words(chunks) == text.split()
+
+    sentences = text.split('. ')
+    sentences[len(sentences) // 2] = 'изменённое предложение'
+    edited = content_defined_chunks('. '.join(sentences), max_tokens=2000)
+    assert len(set(edited) - set(chunks)) <= 2
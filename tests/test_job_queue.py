@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from job_queue import JobQueueFull, JobScheduler
+
+
+@pytest.fixture
+def blocked():
+    # one worker held by the first job, so later jobs stay queued
+    release, started = threading.Event(), threading.Event()
+
+    def handler(job_id):
+        started.set()
+        release.wait(10)
+        return job_id
+
+    scheduler = JobScheduler(handler, num_workers=1, max_queue_size=2, prioritize_short=True)
+    scheduler.start()
+    first = scheduler.submit('running')
+    assert started.wait(5)
+    yield scheduler, first
+    release.set()
+    scheduler.shutdown()
+
+
+def test_full_queue_is_reported_before_submit(blocked):
+    scheduler, _ = blocked
+    scheduler.submit('a', duration=30)
+    assert not scheduler.full()
+    scheduler.submit('b', duration=10)
+    assert scheduler.full()
+    with pytest.raises(JobQueueFull):
+        scheduler.submit('c')
+    assert scheduler.cancel('a')
+    assert not scheduler.full()
+
+
+def test_short_jobs_go_first(blocked):
+    scheduler, _ = blocked
+    scheduler.submit('long', duration=600)
+    scheduler.submit('short', duration=60)
+    assert (scheduler.position('running'), scheduler.position('short'), scheduler.position('long')) == (0, 1, 2)
+
+
+def test_cancelled_job_never_runs(blocked):
+    scheduler, first = blocked
+    queued = scheduler.submit('queued')
+    assert scheduler.cancel('queued')
+    assert queued.cancelled()
+    assert not scheduler.cancel('running')
+    assert scheduler.position('queued') is None
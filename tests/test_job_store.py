@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from job_store import MemoryJobStore, SQLiteJobStore, create_job_store
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return create_job_store(request.param, path=str(tmp_path / 'jobs.db'), ttl_seconds=3600, max_finished=3)
+
+
+def test_create_and_update_round_trip(store):
+    store.create('job', file_path='/tmp/job.wav')
+    job = store.get_status('job')
+    assert (job['status'], job['progress'], job['file_path'], job['finished_at']) == ('pending', 0, '/tmp/job.wav', None)
+
+    timings = {'wall_seconds': 1.5, 'stages': {'merge': {'wall_seconds': 0.1}}}
+    store.update('job', status='processing', step='merge', progress=60, message='Сопоставляем...', timings=timings)
+    job = store.get_status('job')
+    assert (job['status'], job['step'], job['progress'], job['message']) == ('processing', 'merge', 60, 'Сопоставляем...')
+    assert job['timings'] == timings
+    assert store.get_result('job') is None
+
+
+def test_result_is_stored_apart_from_the_status(store):
+    result = {'summary': '# Итоги', 'dialogue': [{'speaker': 'SPEAKER_00', 'start': 0.0, 'end': 1.5, 'text': 'Привет'}],
+              'actions': []}
+    store.create('job')
+    store.update('job', status='completed', result=result)
+    job = store.get_status('job')
+    assert 'result' not in job
+    assert job['finished_at'] is not None
+    assert store.get_result('job') == result
+
+
+def test_partial_dialogue_is_stored_apart_and_removed_with_none(store):
+    partial = [{'speaker': None, 'start': 0.0, 'end': 2.0, 'text': 'Первая реплика'}]
+    store.create('job')
+    store.update('job', status='processing', partial_dialogue=partial)
+    assert 'partial_dialogue' not in store.get_status('job')
+    assert store.get_partial('job') == partial
+    store.update('job', status='completed', partial_dialogue=None)
+    assert store.get_partial('job') is None
+
+
+def test_finished_at_is_kept_from_the_first_finish(store):
+    store.create('job')
+    store.update('job', status='cancelled')
+    finished_at = store.get_status('job')['finished_at']
+    store.update('job', status='cancelled', step='cancelled')
+    assert store.get_status('job')['finished_at'] == finished_at
+
+
+def test_delete_removes_status_result_and_partial(store):
+    store.create('job')
+    store.update('job', partial_dialogue=[], result={'summary': 'x'})
+    store.delete('job')
+    assert store.get_status('job') is None
+    assert store.get_result('job') is None
+    assert store.get_partial('job') is None
+
+
+def test_eviction_keeps_the_newest_finished_jobs(store):
+    for index in range(5):
+        store.create(f'done-{index}')
+        store.update(f'done-{index}', status='completed', result={'index': index})
+        time.sleep(0.01)
+    store.create('running')
+    store.update('running', status='processing')
+    store.evict()
+    assert [store.get_status(f'done-{index}') is not None for index in range(5)] == [False, False, True, True, True]
+    assert store.get_result('done-0') is None
+    assert store.get_status('running')['status'] == 'processing'
+
+
+def test_expired_jobs_are_evicted(store):
+    store.create('old')
+    store.update('old', status='error', error='boom')
+    store.ttl_seconds = 0
+    time.sleep(0.01)
+    store.evict()
+    assert store.get_status('old') is None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    writer, reader = SQLiteJobStore(path), SQLiteJobStore(path)
+    writer.create('job')
+    writer.update('job', status='completed', progress=100, result={'summary': 'готово'})
+    assert reader.get_status('job')['progress'] == 100
+    assert reader.get_result('job') == {'summary': 'готово'}
+
+
+def test_unknown_store_kind():
+    with pytest.raises(ValueError):
+        create_job_store('redis')
+    assert isinstance(create_job_store('memory', path='ignored'), MemoryJobStore)
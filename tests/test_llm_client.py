@@ -0,0 +1,29 @@
+import time
+
+from llm_client import ResponseCache
+
+
+def test_response_cache_is_lru():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+    assert cache.stats() == {'entries': 2, 'hits': 3, 'misses': 1}
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+    cache.put('a', 'A')
+    assert cache.get('a') == 'A'
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_response_cache_key_covers_model_and_temperature():
+    keys = {ResponseCache.key('openai', 'gpt', 0.2, 'prompt'), ResponseCache.key('openai', 'gpt', 0.0, 'prompt'),
+            ResponseCache.key('ollama', 'gpt', 0.2, 'prompt'), ResponseCache.key('openai', 'gpt', 0.2, 'prompt2')}
+    assert len(keys) == 4
@@ -0,0 +1,104 @@
+import os
+import signal
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip("worker processes need the 'fork' start method", allow_module_level=True)
+# the workers set their torch thread budget
+pytest.importorskip('torch')
+
+from process_pool import PipelineProcessPool
+from summary_pipeline import PipelineCancelled
+
+
+class FakePipeline:
+    # Stands in for SummaryPipeline: 'slow' runs until cancelled (or 10 s)
+    concurrent = False
+    speech_recognizer = types.SimpleNamespace(engine_name='whisper')
+    models = types.SimpleNamespace(warm_up=lambda: None)
+
+    def run(self, audio_file, progress_cb=None, *, cancel_check=None, **kwargs):
+        progress_cb(step='speech_recognition', progress=10)
+        if audio_file == 'slow':
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                if cancel_check():
+                    raise PipelineCancelled("Cancelled by user")
+                time.sleep(0.02)
+        return {'file': audio_file, 'pid': os.getpid(), **kwargs}
+
+
+@pytest.fixture
+def pool():
+    pool = PipelineProcessPool(FakePipeline(), num_workers=2, threads_per_worker=1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def run_in_thread(pool, audio_file, **kwargs):
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = pool.run(audio_file, **kwargs)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_runs_jobs_and_relays_progress(pool):
+    events = []
+    result = pool.run('a.wav', progress_cb=lambda **event: events.append(event), title='a')
+    assert result['file'] == 'a.wav' and result['title'] == 'a'
+    assert result['pid'] != os.getpid()
+    assert events == [{'step': 'speech_recognition', 'progress': 10}]
+
+
+def test_idle_workers_killed_are_replaced(pool):
+    # a worker killed while waiting for a task must not wedge the others
+    old_pids = {worker.pid for worker in pool._workers}
+    for worker in pool._workers:
+        os.kill(worker.pid, signal.SIGKILL)
+    wait_until(lambda: not any(worker.is_alive() for worker in pool._workers if worker.pid in old_pids))
+    thread, outcome = run_in_thread(pool, 'b.wav', progress_cb=lambda **event: None)
+    thread.join(15)
+    assert outcome['result']['file'] == 'b.wav'
+    assert outcome['result']['pid'] not in old_pids
+
+
+def test_busy_worker_killed_fails_its_job_only(pool):
+    thread, outcome = run_in_thread(pool, 'slow', progress_cb=lambda **event: None)
+    wait_until(lambda: any(job.worker is not None for job in pool._jobs.values()))
+    busy = next(job.worker for job in pool._jobs.values())
+    os.kill(pool._workers[busy].pid, signal.SIGKILL)
+    thread.join(15)
+    assert 'exited with code' in str(outcome['error'])
+    assert pool.run('c.wav', progress_cb=lambda **event: None)['file'] == 'c.wav'
+
+
+def test_cancel_running_and_queued_jobs(pool):
+    cancelled = threading.Event()
+    jobs = [run_in_thread(pool, 'slow', progress_cb=lambda **event: None, cancel_check=cancelled.is_set)
+            for _ in range(3)]
+    # two workers: the third job waits for one of them
+    wait_until(lambda: len(pool._jobs) == 3 and sum(job.worker is not None for job in pool._jobs.values()) == 2)
+    cancelled.set()
+    for thread, outcome in jobs:
+        thread.join(15)
+        assert isinstance(outcome['error'], PipelineCancelled)
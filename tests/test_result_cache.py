@@ -0,0 +1,39 @@
+import os
+
+from result_cache import ContentCache, ResultCache
+
+
+def test_result_cache_round_trip_by_settings(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.set('hash', 'transcript', {'model': 'small'}, {'text': 'привет'})
+    assert cache.get('hash', 'transcript', {'model': 'small'}) == {'text': 'привет'}
+    assert cache.get('hash', 'transcript', {'model': 'large'}) is None
+    assert cache.invalidate('transcript', model='small') == 1
+    assert cache.get('hash', 'transcript', {'model': 'small'}) is None
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size_mb=0.001)
+    for index in range(3):
+        cache.set(f'hash{index}', 'summary', {}, 'x' * 300)
+        # mtime is the LRU clock
+        os.utime(cache._path(f'hash{index}', 'summary', {}), (index, index))
+    cache.set('hash3', 'summary', {}, 'x' * 300)
+    assert cache.get('hash0', 'summary', {}) is None
+    assert cache.get('hash3', 'summary', {}) == 'x' * 300
+
+
+def test_unreadable_entries_are_dropped(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.set('hash', 'summary', {}, 'ok')
+    with open(cache._path('hash', 'summary', {}), 'w') as f:
+        f.write('{broken')
+    assert cache.get('hash', 'summary', {}) is None
+    assert not cache.contains('hash', 'summary', {})
+
+
+def test_content_cache_is_keyed_by_text(tmp_path):
+    chunks = ContentCache(ResultCache(str(tmp_path)), 'chunk_summary', {'model': 'm'})
+    chunks.set('текст фрагмента', 'резюме')
+    assert chunks.get('текст фрагмента') == 'резюме'
+    assert chunks.get('другой фрагмент') is None
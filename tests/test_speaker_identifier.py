@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from audio_loader import SAMPLE_RATE
+from speaker_identifier import SpeakerIdentifier, has_embedding
+
+
+def test_padded_embeddings_are_not_usable():
+    assert has_embedding(np.random.default_rng(0).normal(size=256))
+    assert not has_embedding(np.zeros(256))
+    assert not has_embedding(np.full(256, np.nan))
+
+
+def test_clusters_the_embeddings_left_after_padding():
+    rng = np.random.default_rng(0)
+    voices = rng.normal(size=(2, 256))
+    embeddings = [voices[0], voices[1] + rng.normal(scale=0.05, size=256), np.zeros(256), voices[1]]
+    usable = np.stack([embedding for embedding in embeddings if has_embedding(embedding)])
+    clusters = SpeakerIdentifier()._cluster_embeddings(usable, pipeline=None)
+    assert list(clusters) in ([0, 1, 1], [1, 0, 0])
+
+
+def test_windowed_diarization_drops_zero_padded_speakers():
+    pytest.importorskip('torch')
+    pytest.importorskip('pyannote.audio')
+    core = pytest.importorskip('pyannote.core')
+    voice = np.random.default_rng(0).normal(size=256)
+
+    class FakePipeline:
+        # every window: SPEAKER_00 speaks throughout, SPEAKER_01 has no centroid
+        def __call__(self, audio, hook=None, return_embeddings=False, **kwargs):
+            duration = audio['waveform'].shape[-1] / SAMPLE_RATE
+            annotation = core.Annotation()
+            annotation[core.Segment(0, duration - 1)] = 'SPEAKER_00'
+            annotation[core.Segment(duration - 1, duration)] = 'SPEAKER_01'
+            return annotation, np.stack([voice, np.zeros(256)])
+
+    class Identifier(SpeakerIdentifier):
+        def _load_pipeline(self):
+            return FakePipeline()
+
+    identifier = Identifier(window_seconds=60, window_overlap=10)
+    diarization = identifier.identify_speakers(np.zeros(200 * SAMPLE_RATE, dtype=np.float32))
+    assert diarization.labels() == ['SPEAKER_00']
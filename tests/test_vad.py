@@ -0,0 +1,52 @@
+import numpy as np
+
+from audio_loader import SAMPLE_RATE
+from vad import SpeechTimeline, VoiceActivityDetector
+
+
+def recording():
+    # 30 s of line noise, 5 s of "speech", 40 s of noise, 70 s of speech
+    rng = np.random.default_rng(0)
+    return np.concatenate([rng.normal(scale=scale, size=seconds * SAMPLE_RATE).astype(np.float32)
+                           for scale, seconds in [(0.001, 30), (0.3, 5), (0.001, 40), (0.2, 70)]])
+
+
+def memory_mapped(waveform, path):
+    buffer = np.memmap(path, dtype=np.float32, mode='w+', shape=waveform.shape)
+    buffer[:] = waveform
+    buffer.flush()
+    return np.memmap(path, dtype=np.float32, mode='c')
+
+
+def test_energy_vad_finds_the_speech():
+    regions = VoiceActivityDetector().detect(recording())
+    assert len(regions) == 2
+    assert abs(regions[0][0] - 30) < 0.5 and abs(regions[1][1] - 145) < 0.5
+
+
+def test_memory_mapped_recording_gives_the_same_regions_and_buffer(tmp_path):
+    waveform = recording()
+    mapped = memory_mapped(waveform, tmp_path / 'audio.f32')
+    detector = VoiceActivityDetector()
+    regions = detector.detect(waveform)
+    assert detector.detect(mapped) == regions
+
+    timeline = SpeechTimeline(regions)
+    compacted = timeline.compact(waveform)
+    mapped_compacted = timeline.compact(mapped)
+    assert isinstance(mapped_compacted, np.memmap)
+    assert np.array_equal(mapped_compacted, compacted)
+    # regions laid end to end with gap seconds of silence between them
+    parts = []
+    for start, end in regions:
+        parts += [waveform[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)],
+                  np.zeros(int(timeline.gap * SAMPLE_RATE), dtype=np.float32)]
+    assert np.array_equal(compacted, np.concatenate(parts[:-1]))
+
+
+def test_times_are_mapped_back_to_the_recording():
+    timeline = SpeechTimeline([(10.0, 15.0), (40.0, 50.0)], gap=0.5)
+    assert timeline.to_original(2.0) == 12.0
+    assert timeline.to_original(5.2, side='right') == 40.0
+    assert timeline.to_original(5.2, side='left') == 15.0
+    assert timeline.to_original(6.5) == 41.0